@@ -0,0 +1,411 @@
+r'''
+Benchmark runner: collects the `asrt( bmark(...), N )` lines from
+the docstrings of the plugins and the `scn_*` scenarios below, runs
+them with warmup and repetitions and compares the results with the
+baseline of this machine.
+Usage:
+
+	python -m plugins.bench -save
+	python -m plugins.bench -threshold 25 -filter time_
+	python -m plugins.bench -http http://127.0.0.1:8275/task_name
+
+The exit code is 1 if there are regressions, so it can be used as
+a gate before an upgrade.
+A line can use the setup lines above it in the same docstring
+(assignments, imports, *def*), the continuation lines that start
+with a comma or a closing bracket are joined to the line above.
+The queues and pools created by the setup lines and by the
+scenarios are stopped after the run. Functions with side effects
+(mouse, clipboard, keyboard layout) are skipped, see `SKIP`.
+'''
+import sys
+import os
+import re
+import json
+import time
+import inspect
+import platform
+import argparse
+import importlib
+import contextvars
+import statistics
+import threading
+import http.client
+import urllib.parse
+from typing import Callable
+from . import portable
+portable.install()
+from .plugin_http_server import HTTPRoutes
+from .tools import asrt, _BmarkInt, TQueue, TPool, TraceSpan \
+, CancelToken, value_to_unit, table_print, qprint, exc_text, time_now_str \
+, APP_VERSION, _init, task_name
+from . import cache
+
+MODULES = (
+	'plugins.tools'
+	, 'plugins.plugin_filesystem'
+	, 'plugins.plugin_network'
+	, 'plugins.plugin_process'
+	, 'plugins.plugin_system'
+	, 'plugins.plugin_http_server'
+)
+SKIP = (
+	'mouse_pos_set'
+	, 'clip_set'
+	, 'clip_get'
+	, 'sys_kboard_lang_set'
+	, 'time_sleep'
+	, 'dev_print'
+	, 'async_run'
+	, 'proc_pool_submit'
+)
+BASELINE_DIR = os.path.join('resources', 'bench')
+_BMARK_LINE = re.compile(r'^\s*asrt\(\s*bmark\(')
+_SETUP_LINE = re.compile(r'^(\w[\w, .\[\]\'"]*=[^=]|import |from |def |class |\t| )')
+_CONT_LINE = re.compile(r'^\s*[,)\]}]')
+
+
+class _Capture:
+	r'''
+	Replaces `bmark` and `asrt` in a docstring namespace: `bmark`
+	measures with warmup and repetitions, `asrt` keeps the
+	documented limit instead of checking it.
+	'''
+
+	def __init__(self, warmup:int, repeat:int):
+		self.warmup:int = warmup
+		self.repeat:int = repeat
+		self.ns:int = 0
+		self.limit:int = 0
+
+	def bmark(self, func, a:tuple=(), ka:dict={}, b_iter:int=10
+	, do_print:bool=False, **kwargs)->int:
+		self.ns = measure(func, a, ka, b_iter, self.warmup, self.repeat)
+		return _BmarkInt(self.ns)
+
+	def asrt(self, value, expect, *args, **kwargs):
+		if isinstance(value, _BmarkInt):
+			self.limit = expect
+			return
+		asrt(value, expect, *args, **kwargs)
+
+
+def measure(func:Callable, a:tuple=(), ka:dict={}, b_iter:int=10
+, warmup:int=1, repeat:int=5)->int:
+	r'''
+	Returns the median of *repeat* rounds of *b_iter* calls
+	in nanoseconds per call, after *warmup* rounds.
+	'''
+	if not isinstance(a, (tuple, list)): a = (a,)
+	b_iter = b_iter or 100
+	rounds = []
+	for rnd in range(warmup + repeat):
+		start = time.perf_counter_ns()
+		for _ in range(b_iter): func(*a, **ka)
+		if rnd >= warmup:
+			rounds.append((time.perf_counter_ns() - start) // b_iter)
+	return int(statistics.median(rounds))
+
+def collect(modules:tuple=MODULES, name_filter:str='')->list[tuple]:
+	r'''
+	Returns a list of (key, setup lines, bmark line, namespace).
+	The key is *module.function:number of the line in the docstring*.
+	'''
+	benches = []
+	for mdl_name in modules:
+		mdl = importlib.import_module(mdl_name)
+		short = mdl_name.rpartition('.')[2]
+		for qualname, obj in _doc_objects(mdl):
+			if qualname.rpartition('.')[2] in SKIP: continue
+			doc = inspect.getdoc(obj) or ''
+			if not 'bmark(' in doc: continue
+			setup = []
+			num = 0
+			for code in _doc_code(doc):
+				if _BMARK_LINE.match(code):
+					key = f'{short}.{qualname}:{num}'
+					num += 1
+					if name_filter and not name_filter in key: continue
+					benches.append((key, tuple(setup), code.strip(), mdl.__dict__))
+				elif _SETUP_LINE.match(code) and not 'bmark(' in code:
+					setup.append(code)
+	for name, scenario in globals().items():
+		if not name.startswith('scn_'): continue
+		key = 'scenario.' + name[4:]
+		if name_filter and not name_filter in key: continue
+		benches.append((key, (), scenario, None))
+	return benches
+
+def _doc_code(doc:str)->list[str]:
+	r'''
+	The indented code lines of a docstring without the indent,
+	a line with unclosed brackets or followed by lines that
+	start with a comma or a bracket is joined with them.
+	`inspect.getdoc` expands the tabs, so one level is 8 spaces.
+	'''
+	lines = []
+	depth = 0
+	for line in doc.expandtabs().splitlines():
+		if not line.startswith(' '):
+			depth = 0
+			continue
+		code = line[8:] if line.startswith(' ' * 8) else line.lstrip()
+		if lines and (depth > 0 or _CONT_LINE.match(code)):
+			lines[-1] += ' ' + code.strip()
+		else:
+			lines.append(code)
+		depth += sum(code.count(c) for c in '([{') \
+			- sum(code.count(c) for c in ')]}')
+		depth = max(depth, 0)
+	return lines
+
+def _owned_factory(cls:type, owned:list)->Callable:
+	' Creates *cls* instances and keeps them in *owned* '
+	def factory(*args, **kwargs):
+		obj = cls(*args, **kwargs)
+		owned.append(obj)
+		return obj
+	return factory
+
+def _stop_owned(objs):
+	' Stops the `TQueue` and `TPool` instances among *objs* '
+	for obj in objs:
+		if isinstance(obj, (TQueue, TPool)): obj.stop()
+
+def _doc_objects(mdl)->list[tuple[str, object]]:
+	' Functions, classes and methods defined in the module '
+	objs = []
+	for name, obj in vars(mdl).items():
+		if getattr(obj, '__module__', None) != mdl.__name__: continue
+		if inspect.isfunction(obj):
+			objs.append((name, obj))
+		elif inspect.isclass(obj):
+			objs.append((name, obj))
+			for mname, meth in vars(obj).items():
+				if inspect.isfunction(meth): objs.append((f'{name}.{mname}', meth))
+	return objs
+
+def run(benches:list[tuple], warmup:int=1, repeat:int=5)->dict[str, dict]:
+	r'''
+	Runs the benchmarks and returns {key: {'ns': int, 'limit': int}}
+	or {key: {'error': str}}.
+	'''
+	results = {}
+	for key, setup, line, namespace in benches:
+		cap = _Capture(warmup=warmup, repeat=repeat)
+		owned = ()
+		try:
+			if namespace is None:
+				func, args, *owned = line()
+				cap.bmark(func, args)
+			else:
+				owned = []
+				nsp = dict(namespace, bmark=cap.bmark, asrt=cap.asrt
+				, TQueue=_owned_factory(TQueue, owned)
+				, TPool=_owned_factory(TPool, owned))
+				if setup: exec('\n'.join(setup), nsp)
+				exec(line, nsp)
+			results[key] = {'ns': cap.ns, 'limit': cap.limit}
+		except Exception:
+			results[key] = {'error': exc_text()}
+		finally:
+			_stop_owned(owned)
+	return results
+
+def baseline_path(machine:str='')->str:
+	return os.path.join(BASELINE_DIR, f'{machine or platform.node()}.json')
+
+def baseline_load(fpath:str)->dict[str, int]:
+	if not os.path.exists(fpath): return {}
+	with open(fpath, encoding='utf-8') as fd:
+		return json.load(fd)['results']
+
+def baseline_save(fpath:str, results:dict[str, dict]):
+	os.makedirs(os.path.dirname(fpath), exist_ok=True)
+	with open(fpath, 'w', encoding='utf-8') as fd:
+		json.dump({
+			'machine': platform.node()
+			, 'python': platform.python_version()
+			, 'version': APP_VERSION
+			, 'date': time_now_str()
+			, 'results': {
+				k: r['ns'] for k, r in sorted(results.items()) if 'ns' in r
+			}
+		}, fd, indent='\t')
+
+def compare(results:dict[str, dict], baseline:dict[str, int]
+, threshold:float=20.0, min_ns:int=200)->list[str]:
+	r'''
+	Prints a table and returns the keys of regressions: slower than
+	the baseline by more than *threshold* percent and *min_ns*.
+	'''
+	regressions = []
+	table = [('Benchmark', 'ns', 'Baseline', 'Diff %', 'Doc limit', 'Status')]
+	for key, res in results.items():
+		if 'error' in res:
+			table.append((key, None, baseline.get(key), None, None
+			, 'error: ' + res['error'].splitlines()[-1][:60]))
+			continue
+		ns, base = res['ns'], baseline.get(key)
+		status, diff = 'new', None
+		if base:
+			diff = round((ns - base) / base * 100, 1)
+			status = 'ok'
+			if diff > threshold and ns - base > min_ns:
+				status = 'REGRESSION'
+				regressions.append(key)
+		table.append((key, ns, base, diff, res['limit'] or None, status))
+	table_print(table, use_headers=True)
+	return regressions
+
+def http_load(url:str, total:int=2000, conns:int=8
+, keep_alive:bool=True)->dict:
+	r'''
+	Sends *total* GET requests to the *url* from *conns* threads,
+	with persistent connections or with a new connection for
+	every request. Returns requests per second, p50 and p99
+	latency in ms and the number of errors.
+	'''
+	parts = urllib.parse.urlsplit(url)
+	path = parts.path + ('?' + parts.query if parts.query else '')
+	headers = {} if keep_alive else {'Connection': 'close'}
+	latencies = []
+	errors = [0]
+	lock = threading.Lock()
+
+	def client(num:int):
+		conn = None
+		for _ in range(num):
+			start = time.perf_counter()
+			try:
+				if conn is None:
+					conn = http.client.HTTPConnection(parts.hostname
+					, parts.port or 80, timeout=30)
+				conn.request('GET', path, headers=headers)
+				resp = conn.getresponse()
+				resp.read()
+				if not keep_alive or resp.will_close:
+					conn.close()
+					conn = None
+			except Exception:
+				with lock: errors[0] += 1
+				if conn: conn.close()
+				conn = None
+				continue
+			with lock: latencies.append(time.perf_counter() - start)
+		if conn: conn.close()
+
+	threads = [
+		threading.Thread(target=client, args=(total // conns,))
+		for _ in range(conns)
+	]
+	start = time.perf_counter()
+	for thr in threads: thr.start()
+	for thr in threads: thr.join()
+	elapsed = time.perf_counter() - start
+	quant = statistics.quantiles(latencies, n=100) if len(latencies) > 1 \
+		else [0] * 99
+	return {
+		'rps': round(len(latencies) / elapsed, 1)
+		, 'p50': round(quant[49] * 1000, 2)
+		, 'p99': round(quant[98] * 1000, 2)
+		, 'errors': errors[0]
+	}
+
+def http_compare(url:str, total:int=2000, conns:int=8):
+	r'''
+	Prints `http_load` results with and without persistent
+	connections. Run it with both *server_backend* settings
+	to compare the servers.
+	'''
+	table = [('Connections', 'Req/s', 'p50 ms', 'p99 ms', 'Errors')]
+	for keep_alive in (False, True):
+		res = http_load(url, total, conns, keep_alive)
+		table.append(('keep-alive' if keep_alive else 'new'
+		, res['rps'], res['p50'], res['p99'], res['errors']))
+	table_print(table, use_headers=True)
+
+def scn_trace_span():
+	return (lambda: TraceSpan('bench').end()), ()
+
+def scn_cancel_token():
+	return CancelToken, ()
+
+def scn_tqueue_put():
+	que = TQueue(consumer=lambda v: None, max_size=0)
+	return que.put, (None,), que
+
+def scn_tpool_submit():
+	pool = TPool(max_workers=4, ident='bench')
+	return pool.submit, ((lambda: None),), pool
+
+def scn_task_name_ctx():
+	r'''
+	`task_name` inside a task, compare with the stack walk
+	of `tools.task_name:0`.
+	'''
+	ctx = contextvars.copy_context()
+	ctx.run(cache.task_ctx.set, ('bench', None))
+	return ctx.run, (task_name, False, True)
+
+def _http_tasks(num:int=300)->list[dict]:
+	' *num* tasks with http=True and two with patterns at the end '
+	tasks = [
+		{'http_re': (re.compile(f'^task_{i}$'),)} for i in range(num)
+	]
+	tasks.append({'http_re': (re.compile(r'api/\w+'),)})
+	tasks.append({'http_re': (re.compile(r'\d+'),)})
+	return tasks
+
+def scn_http_routes_linear():
+	' The scan of `process_req` before `HTTPRoutes` '
+	tasks = _http_tasks()
+
+	def match(path:str):
+		for task in tasks:
+			for pat in task['http_re']:
+				if pat.match(path): return task
+
+	return match, ('api/status',)
+
+def scn_http_routes_index():
+	return HTTPRoutes(_http_tasks()).match, ('api/status',)
+
+def scn_value_to_unit():
+	return value_to_unit, ('5 min', 'sec')
+
+def main():
+	parser = argparse.ArgumentParser(prog='python -m plugins.bench')
+	parser.add_argument('-save', action='store_true'
+	, help='Save the results as the baseline of this machine')
+	parser.add_argument('-threshold', type=float, default=20.0
+	, help='Regression threshold in percent')
+	parser.add_argument('-filter', type=str, default=''
+	, help='Run only benchmarks with this substring')
+	parser.add_argument('-warmup', type=int, default=1)
+	parser.add_argument('-repeat', type=int, default=5)
+	parser.add_argument('-machine', type=str, default=''
+	, help='Baseline name, the computer name by default')
+	parser.add_argument('-http', type=str, default=''
+	, help='Load test this URL of a running server instead')
+	parser.add_argument('-requests', type=int, default=2000)
+	parser.add_argument('-conns', type=int, default=8)
+	args = parser.parse_args()
+	_init(force=True)
+	if args.http:
+		http_compare(args.http, args.requests, args.conns)
+		app.que_print.join()
+		return
+	fpath = baseline_path(args.machine)
+	results = run(collect(name_filter=args.filter)
+	, warmup=args.warmup, repeat=args.repeat)
+	regressions = compare(results, baseline_load(fpath), args.threshold)
+	if args.save:
+		baseline_save(fpath, results)
+		qprint(f'Baseline saved: {fpath}')
+	elif regressions:
+		qprint(f'Regressions: {len(regressions)}')
+	app.que_print.join()
+	sys.exit(1 if regressions and not args.save else 0)
+
+if __name__ == '__main__': main()
@@ -1,7 +1,11 @@
 import datetime
 from collections import OrderedDict
-import windows_toasts as wtoasts
 import functools
+import contextvars
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+	import windows_toasts as wtoasts
+	import asyncio
 
 
 class LRUCache(dict):
@@ -36,7 +40,14 @@ class LRUCache(dict):
 
 
 often:dict[str, datetime.datetime] = dict()
-toast_toasters:dict[str, wtoasts.WindowsToaster] = dict()
+toast_toasters:dict[str, 'wtoasts.WindowsToaster'] = dict()
 toast_imgs = LRUCache(max_items=16)
 public_suffix_list:set = set()
+task_options:dict[tuple, dict] = dict()
+module_state:dict[str, tuple] = dict()
+async_loop:'asyncio.AbstractEventLoop|None' = None
+trace_ctx:contextvars.ContextVar = contextvars.ContextVar('trace_span'
+, default=None)
+task_ctx:contextvars.ContextVar = contextvars.ContextVar('task_ctx'
+, default=None)
 
@@ -116,6 +116,17 @@ THREAD_PRIORITY = {
 	win32con.THREAD_PRIORITY_HIGHEST:       'THREAD_PRIORITY_HIGHEST (2)',
 	win32con.THREAD_PRIORITY_TIME_CRITICAL: 'THREAD_PRIORITY_TIME_CRITICAL (15)',
 }
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_NORMAL = 'normal'
+PRIORITY_BACKGROUND = 'background'
+# Thread priority of the task lanes:
+TASK_PRIORITY = {
+	PRIORITY_INTERACTIVE: win32con.THREAD_PRIORITY_ABOVE_NORMAL,
+	PRIORITY_NORMAL: win32con.THREAD_PRIORITY_NORMAL,
+	PRIORITY_BACKGROUND: win32con.THREAD_PRIORITY_BELOW_NORMAL,
+}
+# Callers that run a task in the interactive lane by default:
+CALLERS_INTERACTIVE = (CALLER_HOTKEY, CALLER_MENU, CALLER_LEFT_CLICK)
 # For displaying small messages:
 HTML_MSG = r'''
 <!doctype html>
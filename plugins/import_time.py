@@ -0,0 +1,89 @@
+r'''
+Import time profile for the `-dev` startup, like `python -X importtime`.  
+*taskopy.py* imports it before anything else, so only the
+standard library can be used here.  
+
+	start()
+	import decimal
+	asrt( 'decimal' in records, True )
+
+'''
+import sys
+import time
+import threading
+
+_local = threading.local()
+records:dict[str, tuple] = {}
+started_ns:int = 0
+
+class _Loader:
+	r'''
+	Wraps a module loader to measure the execution of the module.  
+	The original loader is restored in the module
+	before the execution.  
+	'''
+
+	def __init__(self, loader):
+		self._loader = loader
+
+	def __getattr__(self, name:str):
+		return getattr(self._loader, name)
+
+	def exec_module(self, module):
+		name = module.__spec__.name
+		module.__spec__.loader = module.__loader__ = self._loader
+		stack = _local.__dict__.setdefault('stack', [])
+		stack.append(0)
+		start = time.perf_counter_ns()
+		try:
+			self._loader.exec_module(module)
+		finally:
+			total = time.perf_counter_ns() - start
+			children = stack.pop()
+			if stack: stack[-1] += total
+			records[name] = (total - children, total, len(stack))
+
+class _Finder:
+	r'''
+	Meta path finder that asks the other finders for a spec
+	and wraps its loader.  
+	'''
+
+	@classmethod
+	def find_spec(cls, fullname:str, path=None, target=None):
+		for finder in tuple(sys.meta_path):
+			if finder is cls: continue
+			if not (find_spec := getattr(finder, 'find_spec', None)): continue
+			spec = find_spec(fullname, path, target)
+			if spec is None: continue
+			if hasattr(spec.loader, 'exec_module'):
+				spec.loader = _Loader(spec.loader)
+			return spec
+		return None
+
+def start():
+	' Starts to measure the imports '
+	global started_ns
+	if _Finder in sys.meta_path: return
+	started_ns = time.perf_counter_ns()
+	sys.meta_path.insert(0, _Finder)
+
+def stop():
+	' Stops to measure the imports, the records are kept '
+	if _Finder in sys.meta_path: sys.meta_path.remove(_Finder)
+
+def report(top:int=0)->list[tuple]:
+	r'''
+	Returns a list of (module, self ms, cumulative ms, depth)
+	sorted by the self time.  
+	*top* - only the slowest modules.  
+	'''
+	table = sorted(
+		(
+			(name, round(self_ns / 1e6, 1), round(total_ns / 1e6, 1), depth)
+			for name, (self_ns, total_ns, depth) in tuple(records.items())
+		)
+		, key=lambda r: r[1]
+		, reverse=True
+	)
+	return table[:top] if top else table
@@ -5,19 +5,18 @@ import warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='pyimod02_importers')
 warnings.filterwarnings('ignore', category=UserWarning, module='cryptography')
 
-from cryptography.hazmat.backends import default_backend
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 try:
-	from .tools import patch_import
+	from .tools import patch_import, lazy_attr
 except ImportError: 
-	from .tools import patch_import
+	from .tools import patch_import, lazy_attr
+Fernet = lazy_attr('cryptography.fernet', 'Fernet')
+Scrypt = lazy_attr('cryptography.hazmat.primitives.kdf.scrypt', 'Scrypt')
+default_backend = lazy_attr('cryptography.hazmat.backends', 'default_backend')
 _DEF_SCRYPT_ARGS = {
 	'length': 32
 	, 'n': 2**19
 	, 'r': 8
 	, 'p': 1
-	, 'backend': default_backend()
 }
 _DEF_SALT_BYTES_SIZE = 32
 
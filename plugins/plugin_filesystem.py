@@ -12,7 +12,6 @@ import time
 import glob
 import csv
 import random
-import pyodbc
 import mimetypes
 import zipfile
 import tempfile
@@ -39,6 +38,7 @@ import itertools
 from _winapi import CreateJunction
 from .tools import *
 from .tools import _TERMINAL_WIDTH, _SIZE_UNITS
+pyodbc = lazy_import('pyodbc')
 try:
 	import constants as tcon
 except ModuleNotFoundError:
@@ -4,13 +4,22 @@ import fnmatch
 import hashlib
 import json
 import threading
+import io
+import http.client
+import re
+try:
+	from re import _parser as _re_parser
+except ImportError:
+	import sre_parse as _re_parser
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import cgi
 import urllib
 import email
+import email.utils
 from typing import Pattern
 from .tools import dev_print, app_log, DataHTTPReq \
-	, patch_import, tprint, value_to_unit, exc_text, qprint
+	, patch_import, tprint, value_to_unit, exc_text, qprint, TraceSpan \
+	, TPool, asyncio, thread_start
 from .plugin_filesystem import file_b64_dec, HTTPFile
 try:
 	import constants as tcon
@@ -18,6 +27,9 @@ except ModuleNotFoundError:
 	import plugins.constants as tcon
 
 _FAVICON:tuple = tuple()
+_MIME_OPENMETRICS = 'text/plain; version=0.0.4; charset=utf-8'
+_SEND_BUF_SIZE = 1_048_576
+_RANGES_MAX = 32
 
 if __name__ == '__main__':
 	from tools import warning, random_str
@@ -93,21 +105,13 @@ class HTTPHandlerTasks(BaseHTTPRequestHandler):
 		*content* - page content or HTTPFile instance.  
 		If page is a `list` or `dict` then make JSON string.  
 		'''
-		CHUNK_SIZE = 1024 * 100
-		hfile:HTTPFile = None
+		if hasattr(content, 'HTTPFile'):
+			self.send_file(content, status)
+			return
 		self.send_response(status, 'Ok')
 		if isinstance(content, (dict, list)):
 			content = json.dumps(content, ensure_ascii=False, default=str)
 			if not cont_type: cont_type = tcon.MIME_JSON
-		elif hasattr(content, 'HTTPFile'):
-			hfile = content
-			cont_type = hfile.mime_type
-			param = 'attachment' if hfile.use_save_to else 'inline'
-			fname = urllib.parse.quote(hfile.name, encoding='utf-8')
-			self.send_header('Content-Disposition'
-			, f"{param}; filename*=UTF-8''{fname}")
-			self.send_header('Content-Length'
-			, str(os.path.getsize(hfile.fullpath)))
 		elif not isinstance(content, str):
 			content = str(content)
 		elif '<!doctype html>' in content[:30].lower():
@@ -115,24 +119,164 @@ class HTTPHandlerTasks(BaseHTTPRequestHandler):
 		if not cont_type: cont_type = tcon.MIME_TEXT
 		self.send_header('Content-Type', cont_type)
 		self.end_headers()
-		if hfile:
-			with open(hfile.fullpath, 'rb') as fd:
-				try:
-					while True:
-						chunk = fd.read(CHUNK_SIZE)
-						if not chunk: break
-						self.wfile.write(chunk)
-				except (ConnectionResetError, ConnectionAbortedError):
-					pass
-				except Exception as e:
-					dev_print(f'HTTPFile connection exception: {e}')
+		try:
+			self.wfile.write(bytes(content, 'utf-8'))
+		except ConnectionAbortedError:
+			pass
+		except Exception as e:
+			dev_print(f'connection exception: {e}')
+
+	def send_file(self, hfile:HTTPFile, status:int=200):
+		r'''
+		Sends the file with `send_file_part`. With the *200*
+		status answers *304* to a conditional GET (*ETag*,
+		*Last-Modified*) and *206* to a *Range* request, several
+		ranges go as *multipart/byteranges*.  
+		'''
+		try:
+			fstat = os.stat(hfile.fullpath)
+		except OSError:
+			self.send_error(404)
+			return
+		size = fstat.st_size
+		etag = f'"{fstat.st_mtime_ns:x}-{size:x}"'
+		last_mod = email.utils.formatdate(fstat.st_mtime, usegmt=True)
+		ranges = None
+		if status == 200:
+			if self._not_modified(etag, fstat.st_mtime):
+				self.send_response(304)
+				self.send_header('ETag', etag)
+				self.send_header('Last-Modified', last_mod)
+				self.end_headers()
+				return
+			ranges = self._ranges(size, etag, last_mod)
+		if ranges == []:
+			self.send_response(416)
+			self.send_header('Content-Range', f'bytes */{size}')
+			self.send_header('Content-Length', '0')
+			self.end_headers()
+			return
+		parts = []
+		tail = b''
+		if ranges is None:
+			self.send_response(status, 'Ok')
+			self.send_header('Content-Type', hfile.mime_type)
+			self.send_header('Content-Length', str(size))
+			if size: parts.append((b'', 0, size))
+		elif len(ranges) == 1:
+			start, end = ranges[0]
+			self.send_response(206)
+			self.send_header('Content-Type', hfile.mime_type)
+			self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+			self.send_header('Content-Length', str(end - start + 1))
+			parts.append((b'', start, end - start + 1))
 		else:
+			boundary = random_str(20)
+			for start, end in ranges:
+				parts.append((
+					bytes(
+						f'\r\n--{boundary}\r\nContent-Type: {hfile.mime_type}'
+						+ f'\r\nContent-Range: bytes {start}-{end}/{size}\r\n\r\n'
+						, 'utf-8'
+					)
+					, start, end - start + 1
+				))
+			tail = bytes(f'\r\n--{boundary}--\r\n', 'utf-8')
+			self.send_response(206)
+			self.send_header('Content-Type'
+			, f'multipart/byteranges; boundary={boundary}')
+			self.send_header('Content-Length'
+			, str(sum(len(h) + c for h, _, c in parts) + len(tail)))
+		param = 'attachment' if hfile.use_save_to else 'inline'
+		fname = urllib.parse.quote(hfile.name, encoding='utf-8')
+		self.send_header('Content-Disposition'
+		, f"{param}; filename*=UTF-8''{fname}")
+		self.send_header('Accept-Ranges', 'bytes')
+		self.send_header('ETag', etag)
+		self.send_header('Last-Modified', last_mod)
+		self.end_headers()
+		if self.command == 'HEAD': return
+		with open(hfile.fullpath, 'rb') as fd:
 			try:
-				self.wfile.write(bytes(content, 'utf-8'))
-			except ConnectionAbortedError:
+				for head, offset, count in parts:
+					if head: self.wfile.write(head)
+					self.send_file_part(fd, offset, count)
+				if tail: self.wfile.write(tail)
+			except (ConnectionResetError, ConnectionAbortedError
+			, BrokenPipeError):
 				pass
 			except Exception as e:
-				dev_print(f'connection exception: {e}')
+				dev_print(f'HTTPFile connection exception: {e}')
+
+	def send_file_part(self, fd, offset:int, count:int):
+		r'''
+		Sends *count* bytes of the file from *offset*: with
+		`socket.sendfile` where there is `os.sendfile`, on Windows
+		with `readinto` a reused buffer and `sendall`.  
+		'''
+		if hasattr(os, 'sendfile'):
+			self.connection.sendfile(fd, offset, count)
+			return
+		fd.seek(offset)
+		buf = memoryview(bytearray(min(count, _SEND_BUF_SIZE)))
+		while count > 0:
+			num = fd.readinto(buf[:min(count, len(buf))])
+			if not num: break
+			self.connection.sendall(buf[:num])
+			count -= num
+
+	def _not_modified(self, etag:str, mtime:float)->bool:
+		' Conditional GET: *If-None-Match* or *If-Modified-Since* '
+		if not self.command in ('GET', 'HEAD'): return False
+		if (none_match := self.headers.get('If-None-Match')):
+			return none_match.strip() == '*' or etag in (
+				t.strip().removeprefix('W/') for t in none_match.split(',')
+			)
+		if (mod_since := self.headers.get('If-Modified-Since')):
+			try:
+				return int(mtime) <= \
+					email.utils.parsedate_to_datetime(mod_since).timestamp()
+			except (TypeError, ValueError):
+				return False
+		return False
+
+	def _ranges(self, size:int, etag:str, last_mod:str)->list|None:
+		r'''
+		Parses the *Range* header. Returns `None` if the whole
+		file should be sent, an empty list if no range is
+		satisfiable (`bytes=-0`, a start past the end) or a list
+		of (start, end) inclusive.  
+		'''
+		header = self.headers.get('Range', '')
+		if not header.startswith('bytes='): return None
+		if (
+			(if_range := self.headers.get('If-Range'))
+			and not if_range in (etag, last_mod)
+		):
+			return None
+		ranges = []
+		specs = header[6:].split(',')
+		if len(specs) > _RANGES_MAX: return None
+		for spec in specs:
+			start, sep, end = spec.strip().partition('-')
+			if (
+				not sep
+				or not (start or end)
+				or (start and not start.isdigit())
+				or (end and not end.isdigit())
+			):
+				return None
+			if start:
+				start = int(start)
+				if end and int(end) < start: return None
+				if start >= size: continue
+				end = min(int(end), size - 1) if end else size - 1
+			else:
+				if (suffix := int(end)) == 0 or size == 0: continue
+				start = max(0, size - suffix)
+				end = size - 1
+			ranges.append((start, end))
+		return ranges
 
 	def start_data_processing(self)->tuple:
 		'''
@@ -166,12 +310,34 @@ class HTTPHandlerTasks(BaseHTTPRequestHandler):
 			dev_print('wrong url:', self.path[:70], 'exception:', str(e))
 			self.send_content('wrong url')
 			return
-		if self.url_path == '/log':
-			if self.white_list_check():
-				self.send_content(json.dumps(app_log(), ensure_ascii=False)
-				, cont_type=tcon.MIME_JSON)
+		if self.url_path == '/metrics':
+			if not self.white_list_check():
+				self.send_content('403')
+			elif urllib.parse.parse_qs(self.url_query).get('format') == ['json']:
+				self.send_content(self.tasks.stats_summary())
 			else:
+				self.send_content(_metrics_text(self.tasks)
+				, cont_type=_MIME_OPENMETRICS)
+			return
+		if self.url_path == '/log':
+			if not self.white_list_check():
 				self.send_content('403')
+				return
+			query = urllib.parse.parse_qs(self.url_query)
+			if 'since' in query or 'limit' in query:
+				try:
+					seq, entries = app.log_memory.poll(
+						int(query.get('since', ('0',))[0])
+						, int(query.get('limit', ('0',))[0])
+					)
+				except ValueError:
+					self.send_content('error')
+					return
+				log = {'seq': seq, 'entries': entries}
+			else:
+				log = app_log()
+			self.send_content(json.dumps(log, ensure_ascii=False)
+			, cont_type=tcon.MIME_JSON)
 			return
 		try:
 			params = {
@@ -185,16 +351,7 @@ class HTTPHandlerTasks(BaseHTTPRequestHandler):
 			return
 		page = 'error'
 		task_path = urllib.parse.unquote( self.url_path.strip('/') )
-		task = None
-		re_pat: Pattern
-		for tdic in self.tasks.task_list_http:
-			if not (re_lst := tdic['http_re']): continue
-			for re_pat in re_lst:
-				if re_pat.match(task_path):
-					task = tdic
-					break
-			if task: break
-		else:
+		if not (task := self.tasks.http_routes.match(task_path)):
 			self.s_print('task path not found: "{}"'.format( task_path[:30]) )
 			self.send_content('task not found')
 			return
@@ -213,6 +370,8 @@ class HTTPHandlerTasks(BaseHTTPRequestHandler):
 				self.s_print(f'data_processing error: {error}')
 				self.send_content('error')
 				return
+		span = TraceSpan('http: ' + task['task_func_name']
+		, caller=tcon.CALLER_HTTP)
 		try:
 			if task['result']:
 				result = []
@@ -240,6 +399,7 @@ class HTTPHandlerTasks(BaseHTTPRequestHandler):
 		except:
 			self.s_print(f'HTTP task exception:\n{exc_text(6)}')
 			page = 'error'
+		span.end('ok' if page not in ('error', '<timeout>') else page.strip('<>'))
 		self.send_content(page)
 
 	def do_GET(self):
@@ -362,24 +522,544 @@ class HTTPHandlerTasks(BaseHTTPRequestHandler):
 		if not self.silent:
 			super().log_message(msg_format, *args)
 
+class HTTPRoutes:
+	r'''
+	The index of *http* tasks for `process_req`, built once
+	in `Tasks.start_listeners`. The result is the same as trying
+	every `http_re` of `task_list_http` in order:  
+	- `^name$` patterns (*http=True*) are in a dict;  
+	- patterns that start with a literal are in a trie by the
+	prefix, only the ones along the path are tried;  
+	- the rest are joined in one alternation regex.  
+	Patterns with flags, backreferences, named groups or
+	conditionals are tried one by one, as the alternation
+	would lose the flags and renumber the groups.  
+	Only candidates that come before the exact match are tried.  
+
+		tasks = [{'http_re': (re.compile(p),)} for p in (
+			r'^$', r'^task_a$', r'task_\w+', r'\d+', r'task_a'
+		)]
+		routes = HTTPRoutes(tasks)
+		asrt( routes.match('task_a'), tasks[1] )
+		asrt( routes.match('task_b'), tasks[2] )
+		asrt( routes.match('42'), tasks[3] )
+		asrt( routes.match(''), tasks[0] )
+		asrt( routes.match('nope'), None )
+		asrt( bmark(routes.match, ('task_a',)), 2_000 )
+		tasks = [{'http_re': (p,)} for p in (
+			re.compile(r'^multi$', re.MULTILINE)
+			, re.compile(r'(x)?(?(1)y|z)')
+			, re.compile(r'(a)\1')
+			, re.compile(r'UP', re.IGNORECASE)
+		)]
+		routes = HTTPRoutes(tasks)
+		asrt( routes.match('multi\nline'), tasks[0] )
+		asrt( routes.match('xy'), tasks[1] )
+		asrt( routes.match('aa'), tasks[2] )
+		asrt( routes.match('up'), tasks[3] )
+
+	'''
+	_NO_ALT = re.compile(r'\\\d|\(\?P|\(\?\(')
+
+	def __init__(self, task_list:list[dict]):
+		self.routes:list[tuple[dict, Pattern]] = []
+		self.exact:dict[str, int] = {}
+		self.exact_nl:dict[str, int] = {}
+		self.trie:dict = {}
+		self.alt_re:Pattern|None = None
+		self.alt_routes:dict[int, int] = {}
+		self.single:list[int] = []
+		alt = []
+		for task in task_list:
+			for pat in task['http_re']:
+				order = len(self.routes)
+				self.routes.append((task, pat))
+				if pat.flags != re.UNICODE or self._NO_ALT.search(pat.pattern):
+					self.single.append(order)
+					continue
+				prefix, end = self._literal(pat)
+				if end:
+					self.exact.setdefault(prefix, order)
+					if end == _re_parser.AT_END:
+						self.exact_nl.setdefault(prefix, order)
+				elif prefix:
+					node = self.trie
+					for char in prefix: node = node.setdefault(char, {})
+					node.setdefault('', []).append(order)
+				else:
+					alt.append(order)
+		if alt:
+			parts = []
+			group = 1
+			for order in alt:
+				self.alt_routes[group] = order
+				parts.append(f'({self.routes[order][1].pattern})')
+				group += self.routes[order][1].groups + 1
+			try:
+				self.alt_re = re.compile('|'.join(parts))
+			except re.error:
+				self.alt_routes = {}
+				self.single = sorted(self.single + alt)
+
+	@staticmethod
+	def _literal(pat:Pattern)->tuple[str, object]:
+		r'''
+		Returns the literal prefix of the pattern and the end
+		anchor (`$` or `\Z`) if the pattern is `^literal$`.  
+		'''
+		if pat.flags & re.IGNORECASE: return '', None
+		try:
+			parsed = list(_re_parser.parse(pat.pattern, pat.flags))
+		except Exception:
+			return '', None
+		if parsed and parsed[0] == (_re_parser.AT, _re_parser.AT_BEGINNING):
+			parsed.pop(0)
+		chars = []
+		for op, arg in parsed:
+			if op != _re_parser.LITERAL: break
+			chars.append(chr(arg))
+		rest = parsed[len(chars):]
+		end = None
+		if len(rest) == 1 and rest[0][0] == _re_parser.AT \
+		and rest[0][1] in (_re_parser.AT_END, _re_parser.AT_END_STRING):
+			end = rest[0][1]
+		return ''.join(chars), end
+
+	def match(self, path:str)->dict|None:
+		' Returns the task of the first matching pattern or None '
+		best = self.exact.get(path, len(self.routes))
+		if path.endswith('\n'):
+			best = min(best, self.exact_nl.get(path[:-1], best))
+		candidates = []
+		node = self.trie
+		for char in path:
+			if not (node := node.get(char)): break
+			candidates.extend(o for o in node.get('', ()) if o < best)
+		candidates.extend(o for o in self.single if o < best)
+		if self.alt_re and (m := self.alt_re.match(path)):
+			best = min(best, self.alt_routes[m.lastindex])
+		for order in sorted(candidates):
+			if order >= best: break
+			if self.routes[order][1].match(path):
+				best = order
+				break
+		if best < len(self.routes): return self.routes[best][0]
+		return None
+
+
+class _AsyncConn:
+	r'''
+	A client connection of `AsyncHTTPServer`. The handler
+	thread reads and writes through the event loop.  
+	'''
+
+	def __init__(self, reader:'asyncio.StreamReader'
+	, writer:'asyncio.StreamWriter', loop:'asyncio.AbstractEventLoop'):
+		self.reader = reader
+		self.writer = writer
+		self.loop = loop
+		self.peer:tuple = writer.get_extra_info('peername')[:2]
+
+	def call(self, coro):
+		' Runs the coroutine on the loop and waits for the result '
+		return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+	async def _send(self, data:bytes):
+		self.writer.write(data)
+		await self.writer.drain()
+
+	def send(self, data:bytes):
+		self.call(self._send(data))
+
+	async def _sendfile(self, fd, offset:int, count:int):
+		await self.writer.drain()
+		await self.loop.sendfile(self.writer.transport, fd, offset, count)
+
+	def sendfile(self, fd, offset:int, count:int):
+		r'''
+		`loop.sendfile`: *TransmitFile* with the proactor loop
+		on Windows, `os.sendfile` elsewhere.  
+		'''
+		self.call(self._sendfile(fd, offset, count))
+
+
+class _BodyReader:
+	r'''
+	`rfile` for a big request body: reads from the connection
+	on demand and stops at the *Content-Length*.  
+	'''
+	CHUNK_SIZE = 65536
+
+	def __init__(self, conn:_AsyncConn, length:int):
+		self.conn = conn
+		self.remaining:int = length
+		self.buf = bytearray()
+
+	def _fill(self)->bool:
+		if not self.remaining: return False
+		data = self.conn.call(
+			self.conn.reader.read(min(self.CHUNK_SIZE, self.remaining))
+		)
+		if not data:
+			self.remaining = 0
+			return False
+		self.remaining -= len(data)
+		self.buf += data
+		return True
+
+	def _take(self, size:int)->bytes:
+		data = bytes(self.buf[:size])
+		del self.buf[:size]
+		return data
+
+	def read(self, size:int=-1)->bytes:
+		while (size < 0 or len(self.buf) < size) and self._fill(): pass
+		return self._take(len(self.buf) if size < 0 else size)
+
+	def readline(self, size:int=-1)->bytes:
+		while (
+			(pos := self.buf.find(b'\n')) < 0
+			and (size < 0 or len(self.buf) < size)
+			and self._fill()
+		): pass
+		end = len(self.buf) if pos < 0 else pos + 1
+		if size >= 0: end = min(end, size)
+		return self._take(end)
+
+	def discard(self, max_size:int)->bool:
+		r'''
+		Skips the unread body so the connection can be reused.
+		Returns False if it is bigger than *max_size*.  
+		'''
+		if self.remaining > max_size: return False
+		while self._fill(): self.buf.clear()
+		return True
+
+
+class _RespWriter:
+	r'''
+	`wfile` of `_AsyncHandler`: sends to the connection,
+	wraps the body in chunks when its length is unknown.  
+	'''
+
+	def __init__(self, conn:_AsyncConn):
+		self.conn = conn
+		self.chunked:bool = False
+		self.headers_sent:bool = False
+		self.raw:bool = False
+
+	def write(self, data:bytes)->int:
+		if not data: return 0
+		if not self.headers_sent: self.raw = True
+		if self.chunked:
+			self.conn.send(b'%x\r\n%b\r\n' % (len(data), data))
+		else:
+			self.conn.send(bytes(data))
+		return len(data)
+
+	def flush(self): pass
+
+	def finish(self):
+		if self.chunked:
+			self.chunked = False
+			self.conn.send(b'0\r\n\r\n')
+
+
+class _AsyncHandler(HTTPHandlerTasks):
+	r'''
+	`HTTPHandlerTasks` for a request parsed by `AsyncHTTPServer`:
+	the same white list, routing, uploads and *result* tasks
+	but HTTP/1.1 with persistent connections.  
+	'''
+	protocol_version = 'HTTP/1.1'
+
+	def __init__(self, conn:_AsyncConn, method:str, path:str
+	, version:str, headers:http.client.HTTPMessage, rfile, keep_alive:bool):
+		self.silent = True
+		self.tasks = app.tasks
+		self.req_data = DataHTTPReq()
+		self.client_address = conn.peer
+		self.command = method
+		self.path = path
+		self.request_version = version
+		self.requestline = f'{method} {path} {version}'
+		self.headers = headers
+		self.rfile = rfile
+		self.wfile = _RespWriter(conn)
+		self.close_connection:bool = not keep_alive
+		self._sent_headers:set[str] = set()
+		self._status:int = 0
+
+	def send_response(self, code:int, message:str|None=None):
+		self._status = code
+		super().send_response(code, message)
+
+	def send_header(self, keyword:str, value:str):
+		self._sent_headers.add(keyword.lower())
+		super().send_header(keyword, value)
+
+	def send_file_part(self, fd, offset:int, count:int):
+		self.wfile.conn.sendfile(fd, offset, count)
+
+	def end_headers(self):
+		chunked = False
+		if (
+			not 'content-length' in self._sent_headers
+			and self.command != 'HEAD'
+			and not self._status in (204, 304)
+		):
+			if self.request_version == 'HTTP/1.1':
+				self.send_header('Transfer-Encoding', 'chunked')
+				chunked = True
+			else:
+				self.close_connection = True
+		if not 'connection' in self._sent_headers:
+			self.send_header('Connection'
+			, 'close' if self.close_connection else 'keep-alive')
+		self.wfile.headers_sent = True
+		super().end_headers()
+		self.wfile.chunked = chunked
+
+	def run(self, body_max:int)->bool:
+		r'''
+		Handles the request. Returns True if the connection
+		can be used for the next request.  
+		'''
+		try:
+			if do_method := getattr(self, 'do_' + self.command, None):
+				do_method()
+			else:
+				self.send_error(501, f'Unsupported method ({self.command})')
+			if not self.wfile.headers_sent and not self.wfile.raw:
+				self.send_error(500)
+			self.wfile.finish()
+		except (ConnectionError, asyncio.CancelledError):
+			return False
+		except Exception as e:
+			if sett.dev:
+				dev_print(f'{self.address_string()} async handler'
+				+ f' exception: {exc_text()}')
+			return False
+		if self.wfile.raw: return False
+		if (
+			isinstance(self.rfile, _BodyReader)
+			and not self.rfile.discard(body_max)
+		):
+			return False
+		return not self.close_connection
+
+
+class AsyncHTTPServer:
+	r'''
+	HTTP/1.1 server with persistent connections on its own
+	event loop, so `async def` tasks on the app loop cannot
+	stall it. Requests are parsed on the loop and handled by
+	`_AsyncHandler` in a pool of *workers* threads.
+	An idle connection is closed after *keep_alive* seconds.
+	Chunked request bodies are decoded up to *BODY_MEM_MAX*.  
+	'''
+	HEADER_MAX = 65536
+	BODY_MEM_MAX = 1_048_576
+
+	def __init__(self, ip:str, port:int, workers:int=16
+	, keep_alive:float=15.0):
+		self.loop = asyncio.new_event_loop()
+		self.keep_alive:float = keep_alive
+		self.pool = TPool(max_workers=workers, ident='http')
+		self.conns:dict['asyncio.StreamWriter', 'asyncio.Task'] = {}
+		self._thread = thread_start(self.loop.run_forever
+		, ident='http: asyncio loop', context=False)
+		try:
+			self.server:asyncio.AbstractServer = \
+				asyncio.run_coroutine_threadsafe(
+					asyncio.start_server(self._client, ip, port
+					, limit=self.HEADER_MAX)
+					, self.loop
+				).result()
+		except:
+			self.loop.call_soon_threadsafe(self.loop.stop)
+			raise
+
+	async def _client(self, reader:'asyncio.StreamReader'
+	, writer:'asyncio.StreamWriter'):
+		conn = _AsyncConn(reader, writer, self.loop)
+		self.conns[writer] = asyncio.current_task()
+		try:
+			while True:
+				try:
+					head = await asyncio.wait_for(
+						reader.readuntil(b'\r\n\r\n'), self.keep_alive)
+					if not await self._request(conn, head): break
+				except (asyncio.TimeoutError, asyncio.IncompleteReadError
+				, asyncio.LimitOverrunError, ConnectionError
+				, asyncio.CancelledError):
+					break
+				except Exception:
+					dev_print(f'async HTTP server exception: {exc_text()}')
+					break
+		finally:
+			self.conns.pop(writer, None)
+			writer.close()
+
+	@staticmethod
+	def _reply(conn:_AsyncConn, status:str):
+		' Sends an empty response and closes the connection '
+		conn.writer.write(bytes(f'HTTP/1.1 {status}\r\n'
+		+ 'Content-Length: 0\r\nConnection: close\r\n\r\n', 'ascii'))
+
+	async def _read_chunked(self, conn:_AsyncConn)->bytes|None:
+		r'''
+		Decodes a chunked request body. Returns None if it is
+		malformed or bigger than *BODY_MEM_MAX*.  
+		'''
+		body = bytearray()
+		while True:
+			line = await conn.reader.readuntil(b'\r\n')
+			try:
+				size = int(line.split(b';', 1)[0].strip(), 16)
+			except ValueError:
+				return None
+			if size < 0 or len(body) + size > self.BODY_MEM_MAX: return None
+			if size == 0: break
+			body += await conn.reader.readexactly(size)
+			if await conn.reader.readexactly(2) != b'\r\n': return None
+		while (await conn.reader.readuntil(b'\r\n')) != b'\r\n': pass
+		return bytes(body)
+
+	async def _request(self, conn:_AsyncConn, head:bytes)->bool:
+		line, _, rest = head.partition(b'\r\n')
+		try:
+			method, path, version = str(line, 'iso-8859-1').split()
+			headers = http.client.parse_headers(io.BytesIO(rest))
+			length = int(headers.get('Content-Length', 0))
+			if length < 0: raise ValueError('negative Content-Length')
+		except Exception:
+			self._reply(conn, '400 Bad Request')
+			return False
+		conn_hdr = headers.get('Connection', '').lower()
+		if version == 'HTTP/1.1':
+			keep_alive = conn_hdr != 'close'
+		else:
+			keep_alive = conn_hdr == 'keep-alive'
+		expect = headers.get('Expect', '').lower() == '100-continue'
+		if (te := headers.get('Transfer-Encoding')):
+			if te.strip().lower() != 'chunked':
+				self._reply(conn, '501 Not Implemented')
+				return False
+			if expect: conn.writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+			if (body := await self._read_chunked(conn)) is None:
+				self._reply(conn, '413 Content Too Large')
+				return False
+			del headers['Transfer-Encoding']
+			del headers['Content-Length']
+			headers['Content-Length'] = str(len(body))
+			rfile = io.BytesIO(body)
+		else:
+			if length and expect:
+				conn.writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+			if length <= self.BODY_MEM_MAX:
+				rfile = io.BytesIO(
+					await conn.reader.readexactly(length) if length else b''
+				)
+			else:
+				rfile = _BodyReader(conn, length)
+		handler = _AsyncHandler(conn, method.upper(), path, version
+		, headers, rfile, keep_alive)
+		fut = self.loop.create_future()
+		self.pool.submit(self._run, args=(handler, fut)
+		, ident='http: ' + path[:30])
+		return await fut
+
+	def _run(self, handler:_AsyncHandler, fut:'asyncio.Future'):
+		keep_alive = handler.run(body_max=self.BODY_MEM_MAX)
+		self.loop.call_soon_threadsafe(fut.set_result, keep_alive)
+
+	async def _close(self):
+		self.server.close()
+		tasks = tuple(self.conns.values())
+		for writer in tuple(self.conns): writer.close()
+		if tasks:
+			_, pending = await asyncio.wait(tasks, timeout=1)
+			for atask in pending: atask.cancel()
+			if pending: await asyncio.wait(pending)
+		await self.server.wait_closed()
+
+	def shutdown(self):
+		' Stops accepting and closes the open connections '
+		if self.loop.is_closed() or not self.loop.is_running(): return
+		try:
+			asyncio.run_coroutine_threadsafe(self._close(), self.loop) \
+				.result(timeout=5)
+		except Exception:
+			dev_print(f'async HTTP server shutdown: {exc_text()}')
+		self.pool.stop()
+
+	def server_close(self):
+		' Stops the event loop of the server '
+		if self.loop.is_running():
+			self.loop.call_soon_threadsafe(self.loop.stop)
+			self._thread.join(5)
+		if not self.loop.is_running() and not self.loop.is_closed():
+			self.loop.close()
+
+
 def http_server_start():
 	r'''
-	Starts HTTP server.
+	Starts HTTP server: `ThreadingHTTPServer` or `AsyncHTTPServer`
+	depending on the *server_backend* setting.  
 	'''
 	try:
-		httpd = ThreadingHTTPServer(
-			(sett.server_ip, sett.server_port)
-			, lambda *a: HTTPHandlerTasks(*a)
-		)
+		if sett.server_backend == 'async':
+			httpd = AsyncHTTPServer(sett.server_ip, sett.server_port
+			, workers=sett.server_workers
+			, keep_alive=value_to_unit(sett.server_keep_alive, 'sec'))
+		else:
+			httpd = ThreadingHTTPServer(
+				(sett.server_ip, sett.server_port)
+				, lambda *a: HTTPHandlerTasks(*a)
+			)
 		tprint(
-			'The HTTP server is running at'
+			f'The HTTP server ({sett.server_backend}) is running at'
 			+ f' {sett.server_ip}:{sett.server_port}'
 		)
 		app.tasks.http_server = httpd
-		httpd.serve_forever()
+		if isinstance(httpd, ThreadingHTTPServer): httpd.serve_forever()
 	except Exception as e:
 		print(f'HTTP server error:\n{repr(e)}\n')
 		warning(f'HTTP server error:\n{repr(e)}')
+def _metrics_text(tasks)->str:
+	r'''
+	Task histograms in the Prometheus text format.  
+	'''
+
+	def esc(value)->str:
+		return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+		.replace('\n', '\\n')
+
+	lines = []
+	for kind, descr in (('wait', 'Time in the queue before the task started')
+	, ('run', 'Task run duration')):
+		name = f'taskopy_task_{kind}_seconds'
+		lines.append(f'# HELP {name} {descr}.')
+		lines.append(f'# TYPE {name} histogram')
+		for func_name, task in tuple(tasks.task_dict.items()):
+			for caller, hists in tuple(task['_stats'].items()):
+				hist = hists[kind]
+				labels = f'task="{esc(func_name)}",caller="{esc(caller or "")}"'
+				cum = 0
+				for bound, num in zip(hist.BOUNDS + ('+Inf',), hist.counts):
+					cum += num
+					lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cum}')
+				lines.append(f'{name}_sum{{{labels}}} {hist.total}')
+				lines.append(f'{name}_count{{{labels}}} {hist.count}')
+	lines.append('# HELP taskopy_task_errors Errors in a row.')
+	lines.append('# TYPE taskopy_task_errors gauge')
+	for func_name, task in tuple(tasks.task_dict.items()):
+		lines.append(
+			f'taskopy_task_errors{{task="{esc(func_name)}"}} {int(task["err_counter"])}'
+		)
+	return '\n'.join(lines) + '\n'
+
 def _file_hash(fullpath:str)->str:
 	hash_md5 = hashlib.md5()
 	with open(fullpath, 'rb') as fi:
@@ -1,6 +1,4 @@
 
-import smtplib
-import ssl
 import glob
 import os
 import time
@@ -11,14 +9,17 @@ from email.message import EmailMessage, Message
 from email import message_from_bytes
 from email.header import decode_header, make_header
 from email.utils import parsedate_to_datetime
-import imaplib
 import mimetypes
 from .tools import Job, job_batch, tdebug \
 , patch_import, dev_print, cache, is_con \
-, table_print, time_diff_human, exc_text, exc_texts, str_indent, qprint
+, table_print, time_diff_human, exc_text, exc_texts, str_indent, qprint \
+, lazy_import
 from .plugin_filesystem import file_name_fix, file_size_str \
 , var_get, var_set, path_get
 from .plugin_network import html_clean
+smtplib = lazy_import('smtplib')
+imaplib = lazy_import('imaplib')
+ssl = lazy_import('ssl')
 _CC_LIMIT = 35
 _MAX_FILE_LEN = 200
 _FILE_EXT = 'eml'
@@ -386,7 +387,7 @@ def _get_last_index(folder:str)->int:
 		num = 0
 	return num
 
-def _mail_get_folders(imap:imaplib.IMAP4_SSL)->list:
+def _mail_get_folders(imap:'imaplib.IMAP4_SSL')->list:
 	r'''
 	Gets list of server folders.  
 	Returns [('folder', 'non-ascii alias'), ...]  
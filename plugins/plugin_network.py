@@ -6,10 +6,7 @@ Naming convention:
 import os
 import time
 import socket
-import requests
-from requests.auth import HTTPBasicAuth
 import urllib
-import lxml.html
 import re
 import html
 import psutil
@@ -17,7 +14,6 @@ import tempfile
 import win32file
 from io import BytesIO
 from hashlib import md5
-from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
 import json
 import subprocess
 import datetime
@@ -27,12 +23,11 @@ import threading
 import functools
 import ftplib
 from typing import Iterator, Tuple, Union
-import json2html
-import idna
 from .tools import dev_print, exc_text, tdebug \
 , locale_set, safe, patch_import, re_replace \
 , median, is_iter, str_indent, is_con, qprint, str_remove_white \
-, value_to_unit, task_add, msg_warn, Callable, cache
+, value_to_unit, task_add, msg_warn, Callable, cache, lazy_import \
+, lazy_attr
 from .plugin_filesystem import var_lst_get, path_get, file_name, file_dir
 from .plugin_process import proc_wait
 
@@ -44,9 +39,23 @@ _RE_PING_LOSS = re.compile(r'\((\d+)%')
 _RE_PING_FAIL = re.compile(r' \d+\.\d+\.\d+\.\d+: .+?=\d+\D+[<=]\d+\D+=\d+')
 _RE_PING_TIME = re.compile(r' = (\d+).+? = (\d+).+? = (\d+)')
 _RE_HOST_IP = re.compile(r'\D(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})[\:/]')
-warnings.filterwarnings('ignore', category=MarkupResemblesLocatorWarning)
-requests.packages.urllib3.disable_warnings(
-	requests.packages.urllib3.exceptions.InsecureRequestWarning)
+requests = lazy_import(
+	'requests'
+	, on_load=lambda m: m.packages.urllib3.disable_warnings(
+		m.packages.urllib3.exceptions.InsecureRequestWarning
+	)
+)
+bs4 = lazy_import(
+	'bs4'
+	, on_load=lambda m: warnings.filterwarnings(
+		'ignore', category=m.MarkupResemblesLocatorWarning
+	)
+)
+json2html = lazy_import('json2html')
+idna = lazy_import('idna')
+BeautifulSoup = lazy_attr(bs4, 'BeautifulSoup')
+MarkupResemblesLocatorWarning = lazy_attr(bs4, 'MarkupResemblesLocatorWarning')
+HTTPBasicAuth = lazy_attr('requests.auth', 'HTTPBasicAuth')
 
 def http_req(url:str, encoding:str='utf-8'
 , cookies:dict=None, headers:dict=None
@@ -281,7 +290,7 @@ def html_clean(html_str:str, sep:str=' ', is_mail:bool=False
 	'''
 	SPEC_CHARS = ' \r\n\t\u200b\xa0\u200c'
 	DEL_TAGS = ('script', 'style', 'img')
-	soup = BeautifulSoup(html_str, 'lxml')
+	soup = bs4.BeautifulSoup(html_str, 'lxml')
 	if del_spec:
 		for tag in DEL_TAGS: [s.decompose() for s in soup(tag)]
 	text = soup.get_text(separator=sep)
@@ -351,6 +360,7 @@ def html_element(url:str, element
 	adds it.
 
 	'''
+	import lxml.html
 	
 	def clean_white(text)->str:
 		return str_remove_white(text, algo='space')
@@ -366,12 +376,12 @@ def html_element(url:str, element
 		element_li = [element]
 	result = []
 	if isinstance(element_li[0], dict):
-		parser = BeautifulSoup(html, 'lxml')
+		parser = bs4.BeautifulSoup(html, 'lxml')
 	elif element_li[0].startswith('/'):
 		parser = lxml.html.fromstring(html
 		, parser=lxml.html.HTMLParser(recover=True))
 	else:
-		parser = parser = BeautifulSoup(html, 'lxml')
+		parser = parser = bs4.BeautifulSoup(html, 'lxml')
 	if element_num == 'all':
 		found_elem = parser.find_all(**element)
 		if found_elem:
@@ -388,7 +398,7 @@ def html_element(url:str, element
 		else:
 			raise Exception('html_element: element not found')
 	for elem in element_li:
-		if isinstance(parser, BeautifulSoup):
+		if isinstance(parser, bs4.BeautifulSoup):
 			if len(element_li) == 1:
 				el_num = element_num
 			else:
@@ -496,6 +506,7 @@ def xml_element(url:str, elem:str
 	Example: elem='/result/array/msgContact[1]/msgCtnt'  
 	*kwargs* - additional arguments for http_req.  
 	'''
+	import lxml.etree
 	if url.startswith('http'):
 		status, content = safe(http_req)(url=url, **kwargs)
 		if not status: raise content
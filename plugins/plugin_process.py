@@ -616,7 +616,7 @@ def service_restart(service:str):
 	' Restarts windows service '
 	return win32serviceutil.RestartService(service)
 
-def service_list()->list[psutil._pswindows.WindowsService]:
+def service_list()->'list[psutil._pswindows.WindowsService]':
 	'''
 	Returns the list (generator) of services.  
 	Object `WindowsService` methods: as_dict, binpath, description
@@ -0,0 +1,118 @@
+r'''
+Stand-ins for the Windows-only modules, so the engine can start
+in the `-headless` mode on other systems, e.g. to run and
+benchmark the scheduler and the HTTP server on a Linux CI.
+`install` does nothing on Windows.
+Every name of a stand-in module is `Unavailable`: 0 as a
+constant, `OSError` when called. Only the calls in `PORTABLE`
+work. *pywintypes.error* and *com_error* are `Win32Error`,
+that nothing raises.
+'''
+import os
+import sys
+import time
+import types
+import ctypes
+import tempfile
+import threading
+
+MODULES = (
+	'win32api'
+	, 'win32con'
+	, 'win32gui'
+	, 'win32file'
+	, 'win32evtlog'
+	, 'win32event'
+	, 'win32process'
+	, 'win32print'
+	, 'win32pipe'
+	, 'win32security'
+	, 'win32ts'
+	, 'win32serviceutil'
+	, 'win32clipboard'
+	, 'win32com'
+	, 'win32com.client'
+	, 'win32com.shell'
+	, 'win32com.shell.shell'
+	, 'win32com.shell.shellcon'
+	, 'winerror'
+	, 'pywintypes'
+	, 'pythoncom'
+	, 'winreg'
+	, 'winsound'
+	, 'msvcrt'
+	, '_winapi'
+	, 'windows_toasts'
+)
+PORTABLE = {
+	'GetCurrentProcessId': os.getpid
+	, 'GetCurrentThreadId': threading.get_native_id
+	, 'GetTickCount': lambda: int(time.monotonic() * 1000)
+	, 'GetTempPath': tempfile.gettempdir
+	, 'SetConsoleTitle': lambda title: None
+	, 'CoInitialize': lambda: None
+	, 'CoInitializeEx': lambda flags: None
+	, 'CoUninitialize': lambda: None
+}
+_EXCEPTIONS = ('error', 'com_error')
+
+
+class Win32Error(OSError):
+	' Stands in for *pywintypes.error* and *pythoncom.com_error* '
+
+
+class Unavailable(int):
+	r'''
+	A name of a Windows-only module: 0 as a constant, any
+	attribute is `Unavailable` too, a call raises `OSError`.
+	'''
+	def __new__(cls, name:str):
+		obj = super().__new__(cls, 0)
+		obj._name = name
+		return obj
+
+	def __getattr__(self, name:str):
+		if name.startswith('__'): raise AttributeError(name)
+		return Unavailable(f'{self._name}.{name}')
+
+	def __call__(self, *args, **kwargs):
+		raise OSError(f'{self._name} is not available on {sys.platform}')
+
+	def __repr__(self)->str:
+		return f'<unavailable {self._name}>'
+
+
+class _Module(types.ModuleType):
+	' A stand-in module, see `Unavailable` '
+
+	def __getattr__(self, name:str):
+		if name.startswith('__'): raise AttributeError(name)
+		if name in _EXCEPTIONS: return Win32Error
+		if name in PORTABLE: return PORTABLE[name]
+		return Unavailable(f'{self.__name__}.{name}')
+
+
+def install():
+	r'''
+	Puts the stand-ins in `sys.modules` for the Windows-only
+	modules that cannot be imported, and gives *ctypes* the
+	Windows-only names (*WinDLL* loads nothing).
+	'''
+	if sys.platform == 'win32': return
+	for name in MODULES:
+		if name in sys.modules: continue
+		module = sys.modules[name] = _Module(name)
+		parent, _, child = name.rpartition('.')
+		if parent: setattr(sys.modules[parent], child, module)
+	for name, value in (
+		('WinDLL', lambda name, *args, **kwargs: Unavailable(name))
+		, ('windll', Unavailable('windll'))
+		, ('oledll', Unavailable('oledll'))
+		, ('WINFUNCTYPE', ctypes.CFUNCTYPE)
+		, ('HRESULT', ctypes.c_long)
+		, ('get_last_error', lambda: 0)
+		, ('set_last_error', lambda value: 0)
+		, ('FormatError', lambda code=None: '')
+		, ('WinError', lambda code=None, descr=None: OSError(code, descr))
+	):
+		if not hasattr(ctypes, name): setattr(ctypes, name, value)
@@ -3,9 +3,10 @@ import os
 import gc
 import time
 import datetime
+import calendar
 from datetime import datetime as dtime, timedelta as tdelta, timezone as tzone
 import statistics
-import pytz
+import bisect
 import threading
 import configparser
 import psutil
@@ -33,10 +34,11 @@ import traceback
 import inspect
 import ctypes
 import types
-import pyperclip
 import random
 import functools
 import importlib
+import importlib.util
+import importlib.machinery
 import string
 import difflib
 import argparse
@@ -47,15 +49,17 @@ from queue import Queue
 import queue
 from itertools import zip_longest
 import pythoncom
-import wx
-from collections import defaultdict
-import lxml
+from collections import defaultdict, deque
+import contextvars
+import itertools
 import textwrap
 import io
 import unicodedata
 import multiprocessing
+import concurrent.futures
+import gzip
+import shutil
 from xml.etree import ElementTree as _ElementTree
-import windows_toasts as wtoasts
 try:
 	import constants as tcon
 	import winapi
@@ -65,6 +69,143 @@ except ModuleNotFoundError:
 	import plugins.winapi as winapi
 	import plugins.cache as cache
 
+class _LazyHook:
+	r'''
+	Loader wrapper for `lazy_import` that calls *on_load*
+	when the module is actually executed.  
+	'''
+
+	def __init__(self, loader, on_load:Callable):
+		self._loader = loader
+		self._on_load = on_load
+
+	def __getattr__(self, name:str):
+		return getattr(self._loader, name)
+
+	def exec_module(self, module):
+		module.__spec__.loader = module.__loader__ = self._loader
+		self._loader.exec_module(module)
+		self._on_load(module)
+
+class _MissingModule(types.ModuleType):
+	r'''
+	Returned by `lazy_import` for a module that is not installed:
+	the error is raised on the first attribute access, so an
+	optional dependency (*wx* in the `-headless` mode) is only
+	needed by the code that uses it.  
+	'''
+
+	def __getattr__(self, name:str):
+		if name.startswith('__'): raise AttributeError(name)
+		raise ModuleNotFoundError(f'No module named {self.__name__!r}'
+		, name=self.__name__)
+
+def lazy_import(name:str, on_load:Callable|None=None):
+	r'''
+	Returns the module that is actually executed on the first
+	attribute access, so heavy dependencies do not slow down
+	the startup and *-task* runs.  
+	The module is put in `sys.modules`, so a regular `import`
+	elsewhere gets the same module.  
+	*on_load* - a function to call with the module right
+	after the execution, e.g. to set up warnings. If the
+	module is already executed, it is called at once.  
+	Use it only for modules that are not used at import time,
+	including annotations.  
+	C extensions (like *lxml.etree*) cannot be deferred, they
+	are imported at once: import them inside the functions.  
+	For a submodule (*requests.auth*) the parent package is
+	executed at once to find the submodule, use `lazy_attr`
+	with the module path instead.  
+	A module that is not installed raises `ModuleNotFoundError`
+	on the first attribute access.  
+
+		asrt( lazy_import('json').dumps(1), '1' )
+		asrt( type(lazy_import('no_such_module')).__name__, '_MissingModule' )
+		asrt( bmark(lazy_import, ('json',)), 1_000 )
+
+	'''
+	if (module := sys.modules.get(name)) is not None:
+		if on_load and type(module) is types.ModuleType: on_load(module)
+		return module
+	spec = importlib.util.find_spec(name)
+	if spec is None: return _MissingModule(name)
+	if isinstance(spec.loader, importlib.machinery.ExtensionFileLoader):
+		module = importlib.import_module(name)
+		if on_load: on_load(module)
+		return module
+	loader = _LazyHook(spec.loader, on_load) if on_load else spec.loader
+	spec.loader = importlib.util.LazyLoader(loader)
+	module = importlib.util.module_from_spec(spec)
+	sys.modules[name] = module
+	spec.loader.exec_module(module)
+	parent, _, child = name.rpartition('.')
+	if parent: setattr(sys.modules[parent], child, module)
+	return module
+
+class _LazyAttr:
+	r'''
+	A stand-in for a class or function of a lazy module, see
+	`lazy_attr`.  
+	'''
+	__slots__ = ('_module', '_name', '_qualname')
+
+	def __init__(self, module, name:str, qualname:str):
+		self._module = module
+		self._name = name
+		self._qualname = qualname
+
+	def _get(self):
+		if isinstance(self._module, str):
+			self._module = importlib.import_module(self._module)
+		return getattr(self._module, self._name)
+
+	def __call__(self, *args, **kwargs):
+		return self._get()(*args, **kwargs)
+
+	def __getattr__(self, name:str):
+		return getattr(self._get(), name)
+
+	def __instancecheck__(self, obj)->bool:
+		return isinstance(obj, self._get())
+
+	def __subclasscheck__(self, cls)->bool:
+		return issubclass(cls, self._get())
+
+	def __mro_entries__(self, bases:tuple)->tuple:
+		return (self._get(),)
+
+	def __repr__(self)->str:
+		return f'<lazy {self._qualname}>'
+
+def lazy_attr(module, name:str)->_LazyAttr:
+	r'''
+	Returns a stand-in for *module.name* that does not execute
+	the lazy *module* until it is called or its attribute is
+	accessed, so the name can be star-exported by a plugin.
+	`isinstance`, `issubclass` and subclassing work.  
+	*module* - a module from `lazy_import` or the dotted path
+	of a module, that is imported only on the first access, so
+	even its parent package is not executed before that.  
+
+		dumps = lazy_attr(lazy_import('json'), 'dumps')
+		asrt( dumps(1), '1' )
+		mime_text = lazy_attr('email.mime.text', 'MIMEText')
+		asrt( repr(mime_text), '<lazy email.mime.text.MIMEText>' )
+		asrt( isinstance(mime_text('x'), mime_text), True )
+
+	'''
+	if isinstance(module, str):
+		return _LazyAttr(module, name, module + '.' + name)
+	qualname = object.__getattribute__(module, '__name__') + '.' + name
+	return _LazyAttr(module, name, qualname)
+
+asyncio = lazy_import('asyncio')
+wx = lazy_import('wx')
+pytz = lazy_import('pytz')
+pyperclip = lazy_import('pyperclip')
+wtoasts = lazy_import('windows_toasts')
+
 APP_NAME = 'Taskopy'
 APP_VERSION = 'v2026-06-06'
 APP_FULLNAME = APP_NAME + ' ' + APP_VERSION
@@ -105,7 +246,7 @@ _TIME_UNITS = {
 }
 _LOCALE_LOCK = threading.Lock()
 _LOG_TIME_FORMAT = '%Y.%m.%d %H:%M:%S'
-_TERMINAL_WIDTH = os.get_terminal_size().columns - 1
+_TERMINAL_WIDTH = shutil.get_terminal_size().columns - 1
 TASK_ATTR:str = '__is_task__'
 if (lambda: False)(): gdic:dict = {}
 _MAIN_PID = os.getpid()
@@ -175,21 +316,100 @@ class SuppressPrint:
 class TQueue(Queue):
 	r'''
 	A queue that sends everything to the consumer in a different thread.  
+	*batch* - the consumer gets a list of up to *batch* items
+	instead of one item: everything that came during *batch_wait*
+	seconds after the first item (group commit).  
+	*overflow* - what `put` does when the queue is full:  
+		'block' - wait for a free place (the default).  
+		'drop_oldest' - remove the oldest item.  
+		'drop_newest' - discard the new item.  
+		'sample' - when the queue is more than 3/4 full, keep
+		only every *sample_every* item, discard the new item
+		when it is full.  
+	The producer never waits with the 'drop_*' and 'sample'
+	policies.  
 
 		q = TQueue()
 		q.put(1)
 		q.stop()
+		q = TQueue(consumer=lambda v: None, overflow='drop_newest')
+		asrt( bmark(q.put, (None,)), 3_000 )
+		q.stop()
 
 	'''
+	OVERFLOW = ('block', 'drop_oldest', 'drop_newest', 'sample')
+
 	def __init__(self, consumer:Callable=lambda v: qprint(v)
-	, max_size:int=4096)->None:
+	, max_size:int=4096, batch:int=0, batch_wait:float=0.0
+	, overflow:str='block', sample_every:int=10)->None:
 		super().__init__(maxsize=max_size)
+		if not overflow in self.OVERFLOW:
+			raise ValueError(f'unknown overflow policy: {overflow}')
 		self._stop_sentinel:object = object()
 		self.consumer:Callable=consumer
-		thread_start(func=self.consumer_thread
-		, ident='TQueue: ' + consumer.__name__)
+		self.batch:int = batch
+		self.batch_wait:float = batch_wait
+		self.overflow:str = overflow
+		self.sample_every:int = sample_every
+		self.high_water:int = 0
+		self.dropped:int = 0
+		self._sampled:int = 0
+		self._thread = thread_start(func=self.consumer_thread
+		, ident='TQueue: ' + consumer.__name__, context=False)
+
+	def _put(self, item):
+		super()._put(item)
+		if len(self.queue) > self.high_water:
+			self.high_water = len(self.queue)
+
+	def put(self, item, block:bool=True, timeout:float|None=None):
+		r'''
+		Puts the item according to the *overflow* policy.  
+		'''
+		if self.overflow == 'block' or not self.maxsize:
+			super().put(item, block=block, timeout=timeout)
+			return
+		if self.overflow == 'sample' and self.qsize() * 4 > self.maxsize * 3:
+			with self.mutex:
+				self._sampled += 1
+				is_drop = self._sampled % self.sample_every != 0
+				if is_drop: self.dropped += 1
+			if is_drop: return
+		while True:
+			try:
+				super().put(item, block=False)
+				return
+			except queue.Full:
+				if self.overflow != 'drop_oldest':
+					self._drop()
+					return
+			try:
+				old = self.get_nowait()
+			except queue.Empty:
+				continue
+			if old is self._stop_sentinel:
+				super().put(old)
+				return
+			self.task_done()
+			self._drop()
+
+	def _drop(self):
+		' Counts a dropped item, the producers may be in different threads '
+		with self.mutex: self.dropped += 1
+
+	def stats(self)->dict:
+		r'''
+		Returns the current depth, the high-water mark and
+		the number of dropped items.  
+		'''
+		with self.mutex:
+			return {'depth': self._qsize(), 'high_water': self.high_water
+			, 'dropped': self.dropped}
 	
 	def consumer_thread(self):
+		if self.batch:
+			self._consume_batches()
+			return
 		while True:
 			item = self.get()
 			if item is self._stop_sentinel:
@@ -200,6 +420,32 @@ class TQueue(Queue):
 				dev_print(self.consumer.__name__
 				, 'exception:' + str_indent(exc_text(3) ) )
 			self.task_done()
+
+	def _consume_batches(self):
+		is_stop = False
+		while not is_stop:
+			items = [self.get()]
+			deadline = time.perf_counter() + self.batch_wait
+			while len(items) < self.batch:
+				if items[-1] is self._stop_sentinel: break
+				try:
+					timeout = deadline - time.perf_counter()
+					if timeout > 0:
+						items.append(self.get(timeout=timeout))
+					else:
+						items.append(self.get_nowait())
+				except queue.Empty:
+					break
+			if items[-1] is self._stop_sentinel:
+				is_stop = True
+				items.pop()
+			if items:
+				try:
+					self.consumer(items)
+				except:
+					dev_print(self.consumer.__name__
+					, 'exception:' + str_indent(exc_text(3) ) )
+			for _ in items: self.task_done()
 	
 	def stop(self, timeout:float=0.0, polling_interval:float=0.001):
 		r'''
@@ -211,7 +457,724 @@ class TQueue(Queue):
 			while not self.empty():
 				if time.time() - start >= timeout: break
 				time.sleep(polling_interval)
-		self.put(self._stop_sentinel)
+		super().put(self._stop_sentinel)
+		if timeout: self._thread.join(timeout)
+
+
+class TPoolLimits:
+	r'''
+	The per-key running counters and waiting jobs of `TPool.submit`
+	with *limit*. Pools that share one instance share the limits,
+	e.g. the priority lanes of the task pool.  
+
+		limits = TPoolLimits()
+		pools = [TPool(max_workers=2, limits=limits) for _ in range(2)]
+		lock, cur = threading.Lock(), [0, 0]
+		def job():
+			with lock: cur[0] += 1; cur[1] = max(cur)
+			time.sleep(0.02)
+			with lock: cur[0] -= 1
+		for i in range(4): pools[i % 2].submit(job, key='k', limit=1)
+		time.sleep(0.3)
+		asrt( cur, [0, 1] )
+		for pool in pools: pool.stop()
+
+	'''
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.active:dict[str, int] = {}
+		self.pending:dict[str, list[tuple['TPool', tuple]]] = {}
+
+
+class TPool:
+	r'''
+	A bounded pool of worker threads.
+	Workers are started on demand up to *max_workers* and exit after
+	*idle_timeout* seconds without work, so a burst of jobs does not
+	spawn a new thread for every job.
+	*key* and *limit* in `submit` restrict the number of jobs with the
+	same key that are running at the same time, the rest of them wait
+	in line.
+	Every worker keeps its counters in `app.app_threads`: *jobs*,
+	*wait* (queue wait of the current job), *wait_total*
+	and *run_total* in seconds.
+	*priority* - the thread priority of the workers, a constant
+	like `win32con.THREAD_PRIORITY_NORMAL`.
+	*limits* - a `TPoolLimits` shared with other pools, so the
+	*limit* of a key counts the jobs in all of them.
+
+		pool = TPool(max_workers=2)
+		pool.submit(qprint, args=('done',))
+		pool.stop()
+
+	Jobs that waited in line at *max_workers* do not leave a
+	stale idle worker behind, so a job after the idle timeout
+	still gets a worker:
+
+		pool = TPool(max_workers=1, idle_timeout=0.1)
+		for _ in range(3): pool.submit(time.sleep, args=(0.05,))
+		time.sleep(0.5)
+		event = threading.Event()
+		pool.submit(event.set)
+		asrt( event.wait(2), True )
+		pool.stop()
+
+	'''
+	def __init__(self, max_workers:int=32, idle_timeout:float=60.0
+	, ident:str='TPool'
+	, priority:int=win32con.THREAD_PRIORITY_NORMAL
+	, limits:TPoolLimits|None=None)->None:
+		self.max_workers:int = max(1, int(max_workers))
+		self.idle_timeout:float = idle_timeout
+		self.ident:str = ident
+		self.priority:int = priority
+		self._que:Queue = Queue()
+		self._lock = threading.Lock()
+		self._stop_sentinel:object = object()
+		self._workers:int = 0
+		self._idle:int = 0
+		self._limits:TPoolLimits = limits or TPoolLimits()
+		self.jobs_done:int = 0
+		self.wait_total:float = 0.0
+		self.wait_max:float = 0.0
+		self.run_total:float = 0.0
+
+	def submit(self, func:Callable, args:tuple=(), kwargs:dict={}
+	, key:str|None=None, limit:int=0, ident:str=''):
+		r'''
+		Puts the job in the queue.
+		*key* - a job group like a task name.
+		*limit* - maximum number of running jobs with this *key*
+		, 0 - no limit.
+		'''
+		job = (func, args, kwargs, key, time.perf_counter()
+		, ident or func.__name__, contextvars.copy_context())
+		if key is not None and limit > 0:
+			lim = self._limits
+			with lim.lock:
+				if lim.active.get(key, 0) >= limit:
+					lim.pending.setdefault(key, []).append((self, job))
+					return
+				lim.active[key] = lim.active.get(key, 0) + 1
+		self._put(job)
+
+	def _put(self, job:tuple):
+		r'''
+		Queues the job and starts a worker if there are fewer idle
+		workers than queued jobs. The job is put under the lock, so
+		a worker that is leaving on the idle timeout sees it.  
+		'''
+		with self._lock:
+			self._que.put(job)
+			if self._idle >= self._que.qsize(): return
+			if self._workers >= self.max_workers: return
+			self._workers += 1
+		thread_start(self._worker, ident=self.ident, priority=self.priority
+		, context=False)
+
+	def _job_done(self, key:str|None):
+		r'''
+		Frees the place of the job with a *limit*: the next waiting
+		job with this key goes to its pool.  
+		'''
+		if key is None: return
+		lim = self._limits
+		with lim.lock:
+			if not key in lim.active: return
+			if (pending := lim.pending.get(key)):
+				pool, job = pending.pop(0)
+				if not pending: del lim.pending[key]
+			else:
+				lim.active[key] -= 1
+				if lim.active[key] <= 0: del lim.active[key]
+				return
+		pool._put(job)
+
+	def _worker(self):
+		thread = threading.current_thread()
+		tid = thread.native_id
+		counters = {'jobs': 0, 'wait': 0.0, 'wait_total': 0.0
+		, 'run_total': 0.0}
+
+		def idle_info()->dict:
+			return {'func': self.ident + ' (idle)', 'stime': dtime.now()
+			, 'thread': thread, **counters}
+
+		app.app_threads[tid] = idle_info()
+		while True:
+			with self._lock: self._idle += 1
+			try:
+				job = self._que.get(timeout=self.idle_timeout)
+			except queue.Empty:
+				with self._lock:
+					self._idle -= 1
+					if self._que.qsize(): continue
+					self._workers -= 1
+				return
+			with self._lock:
+				self._idle -= 1
+				if job is self._stop_sentinel:
+					self._workers -= 1
+					return
+			func, args, kwargs, key, queued, ident, ctx = job
+			start = time.perf_counter()
+			wait = start - queued
+			counters['wait'] = wait
+			counters['wait_total'] += wait
+			app.app_threads[tid] = {'func': ident, 'stime': dtime.now()
+			, 'thread': thread, **counters}
+			try:
+				ctx.run(func, *args, **kwargs)
+			except:
+				dev_print(f'exception in «{ident}»:' + str_indent(exc_text(3)))
+			run = time.perf_counter() - start
+			counters['jobs'] += 1
+			counters['run_total'] += run
+			with self._lock:
+				self.jobs_done += 1
+				self.wait_total += wait
+				self.run_total += run
+				if wait > self.wait_max: self.wait_max = wait
+			self._job_done(key)
+			app.app_threads[tid] = idle_info()
+
+	def stats(self)->dict:
+		r'''
+		Returns the pool counters. Times are in seconds.
+		'''
+		with self._limits.lock:
+			pending = sum(
+				pool is self
+				for jobs in self._limits.pending.values() for pool, _ in jobs
+			)
+		with self._lock:
+			return {
+				'workers': self._workers
+				, 'queued': self._que.qsize()
+				, 'pending': pending
+				, 'jobs': self.jobs_done
+				, 'wait_avg': self.wait_total / (self.jobs_done or 1)
+				, 'wait_max': self.wait_max
+				, 'run_avg': self.run_total / (self.jobs_done or 1)
+			}
+
+	def stop(self):
+		r'''
+		Stops idle workers. Running jobs are not interrupted.
+		'''
+		with self._lock: workers = self._workers
+		for _ in range(workers): self._que.put(self._stop_sentinel)
+
+
+class ProcPoolError(Exception):
+	' An exception in a `ProcPool` job, the text has the remote traceback '
+
+
+def _proc_worker(conn, preload:tuple):
+	r'''
+	The loop of a `ProcPool` worker process: receives
+	(func, args, kwargs), sends back (ok:bool, result or
+	exception text, RSS in bytes).  
+	'''
+	for mdl_name in preload:
+		try:
+			importlib.import_module(mdl_name)
+		except Exception:
+			print(f'{mdl_name} preload error:' + str_indent(exc_text(3)))
+	proc = psutil.Process()
+	while True:
+		try:
+			job = conn.recv()
+		except (EOFError, OSError):
+			return
+		if job is None: return
+		func, args, kwargs = job
+		try:
+			reply = (True, func(*args, **kwargs))
+		except Exception:
+			reply = (False, exc_text(6))
+		try:
+			conn.send((*reply, proc.memory_info().rss))
+		except (EOFError, OSError):
+			return
+		except Exception:
+			conn.send((False, exc_text(3), proc.memory_info().rss))
+
+
+class ProcPool:
+	r'''
+	A pool of long-lived worker processes for CPU-bound jobs.
+	Every worker is served by a thread in this process that sends
+	jobs through a pipe and waits for the result without holding
+	the GIL.
+	Workers start on demand up to *size* and preload the *preload*
+	modules (the crontab and plugins), so a job does not pay for
+	a process start. A worker is replaced after *max_jobs* jobs,
+	when its memory (RSS) exceeds *max_mem* bytes or after
+	`recycle` (a crontab reload).
+	Caveats are the same as in `run_in_process`: everything must be
+	pickle-friendly and *app_* functions do not work in a worker.
+
+		pool = ProcPool(size=2, preload=())
+		asrt( pool.submit(pow, (2, 10)).result(), 1024 )
+		pool.stop()
+
+	'''
+	def __init__(self, size:int=0, max_jobs:int=500
+	, max_mem:int=1_073_741_824, preload:tuple=('crontab',)
+	, ident:str='ProcPool')->None:
+		self.size:int = int(size) or os.cpu_count() or 1
+		self.max_jobs:int = int(max_jobs)
+		self.max_mem:int = int(max_mem)
+		self.preload:tuple = tuple(preload)
+		self.ident:str = ident
+		self._ctx = multiprocessing.get_context('spawn')
+		self._que:Queue = Queue()
+		self._lock = threading.Lock()
+		self._stop_sentinel:object = object()
+		self._handlers:int = 0
+		self._idle:int = 0
+		self._generation:int = 0
+		self._running:dict = {}
+		self._killed:set = set()
+		self.jobs_done:int = 0
+		self.recycled:int = 0
+		self.killed:int = 0
+
+	def submit(self, func:Callable, args:tuple=(), kwargs:dict={}
+	)->concurrent.futures.Future:
+		r'''
+		Puts the job in the queue and returns
+		a `concurrent.futures.Future` with its result.
+		An exception in the job is raised by `Future.result`
+		as `ProcPoolError`.
+		'''
+		future = concurrent.futures.Future()
+		self._que.put((future, func, args, kwargs))
+		with self._lock:
+			if self._idle or self._handlers >= self.size: return future
+			self._handlers += 1
+		thread_start(self._handler, ident=f'{self.ident}: worker'
+		, context=False)
+		return future
+
+	def _spawn(self)->tuple:
+		conn, child_conn = self._ctx.Pipe()
+		proc = self._ctx.Process(target=_proc_worker
+		, args=(child_conn, self.preload), daemon=True
+		, name=self.ident)
+		proc.start()
+		child_conn.close()
+		return proc, conn
+
+	@staticmethod
+	def _retire(proc, conn):
+		try:
+			conn.send(None)
+		except Exception:
+			pass
+		proc.join(5)
+		if proc.is_alive(): proc.kill()
+		conn.close()
+
+	def _handler(self):
+		proc = conn = None
+		generation = jobs = 0
+		while True:
+			with self._lock: self._idle += 1
+			job = self._que.get()
+			with self._lock: self._idle -= 1
+			if job is self._stop_sentinel: break
+			future, func, args, kwargs = job
+			if not future.set_running_or_notify_cancel(): continue
+			if proc and generation != self._generation:
+				self._retire(proc, conn)
+				proc = None
+			if proc is None:
+				try:
+					proc, conn = self._spawn()
+				except Exception:
+					future.set_exception(ProcPoolError(exc_text(3)))
+					continue
+				generation, jobs = self._generation, 0
+			with self._lock: self._running[future] = proc
+			try:
+				conn.send((func, args, kwargs))
+				ok, value, rss = conn.recv()
+			except (EOFError, OSError):
+				with self._lock:
+					if future in self._killed:
+						self._killed.discard(future)
+						value = 'the job was killed'
+					else:
+						value = f'worker process exited ({proc.exitcode})'
+				ok, rss = False, 0
+				conn.close()
+				proc = None
+			except Exception:
+				ok, value, rss = False, exc_text(3), 0
+			with self._lock:
+				self._running.pop(future, None)
+				self.jobs_done += 1
+			jobs += 1
+			if ok:
+				future.set_result(value)
+			else:
+				future.set_exception(ProcPoolError(value))
+			if proc and (jobs >= self.max_jobs or rss > self.max_mem):
+				self._retire(proc, conn)
+				proc = None
+				with self._lock: self.recycled += 1
+		if proc: self._retire(proc, conn)
+		with self._lock: self._handlers -= 1
+
+	def kill(self, future:concurrent.futures.Future)->bool:
+		r'''
+		Kills the worker process that runs the job of the *future*,
+		the *future* gets `ProcPoolError`. A new worker is started
+		for the next job. Returns False if the job is not running.  
+		'''
+		with self._lock:
+			if not (proc := self._running.get(future)): return False
+			self._killed.add(future)
+			self.killed += 1
+		proc.kill()
+		return True
+
+	def recycle(self):
+		r'''
+		Workers will be replaced before their next job,
+		e.g. to load a new version of the crontab.
+		'''
+		with self._lock: self._generation += 1
+
+	def stats(self)->dict:
+		' Returns the pool counters '
+		with self._lock:
+			return {
+				'workers': self._handlers
+				, 'busy': len(self._running)
+				, 'queued': self._que.qsize()
+				, 'jobs': self.jobs_done
+				, 'recycled': self.recycled
+				, 'killed': self.killed
+			}
+
+	def stop(self):
+		r'''
+		Stops the workers after their current jobs.
+		'''
+		with self._lock: handlers = self._handlers
+		for _ in range(handlers): self._que.put(self._stop_sentinel)
+
+
+class TaskCancelled(Exception):
+	' Raised by `CancelToken.check` in a cancelled task '
+
+
+class CancelToken:
+	r'''
+	Cooperative cancellation of a task run. A task with
+	the *cancel* argument gets a token and should check it
+	in long loops. The token is cancelled by `task_cancel`
+	or when the *timeout* of a task whose result is awaited
+	(HTTP) expires.
+	*timer* - id of the timeout timer in the scheduler.
+
+		def long_task(cancel:CancelToken=None):
+			for fpath in dir_files('d:\\'):
+				cancel.check()
+				...
+
+		token = CancelToken()
+		asrt( token.wait(0.01), False )
+		token.cancel()
+		asrt( token.cancelled, True )
+
+	'''
+	__slots__ = ('_event', '_lock', '_callbacks', 'reason', 'timer')
+
+	def __init__(self):
+		self._event = threading.Event()
+		self._lock = threading.Lock()
+		self._callbacks:list[Callable] = []
+		self.reason:str = ''
+		self.timer:int = 0
+
+	def cancel(self, reason:str='cancelled'):
+		with self._lock:
+			if self._event.is_set(): return
+			self.reason = reason
+			self._event.set()
+			callbacks, self._callbacks = self._callbacks, []
+		for func in callbacks:
+			try:
+				func()
+			except Exception:
+				dev_print('cancel callback exception:' + str_indent(exc_text(3)))
+
+	def on_cancel(self, func:Callable):
+		r'''
+		Calls *func* when the token is cancelled or at once
+		if it is already cancelled.  
+		'''
+		with self._lock:
+			if not self._event.is_set():
+				self._callbacks.append(func)
+				return
+		func()
+
+	@property
+	def cancelled(self)->bool:
+		return self._event.is_set()
+
+	def check(self):
+		' Raises `TaskCancelled` if the token is cancelled '
+		if self._event.is_set(): raise TaskCancelled(self.reason)
+
+	def is_cancel(self, exc:BaseException)->bool:
+		r'''
+		Returns True if the exception is the result of the
+		cancellation: `TaskCancelled` or, after `cancel`, the
+		`ProcPoolError` of a killed job and the cancelled future
+		of an *isolate* task.  
+
+			token = CancelToken()
+			asrt( token.is_cancel(ProcPoolError('killed')), False )
+			token.cancel('timeout')
+			asrt( token.is_cancel(ProcPoolError('killed')), True )
+			asrt( token.is_cancel(concurrent.futures.CancelledError()), True )
+			asrt( token.is_cancel(ValueError()), False )
+
+		'''
+		if isinstance(exc, TaskCancelled): return True
+		return self._event.is_set() and isinstance(exc
+		, (ProcPoolError, concurrent.futures.CancelledError))
+
+	def wait(self, timeout:float|str|None=None)->bool:
+		r'''
+		Sleeps for *timeout* (seconds or a string like '5 sec')
+		and returns True as soon as the token is cancelled.  
+		'''
+		if isinstance(timeout, str): timeout = value_to_unit(timeout, 'sec')
+		return self._event.wait(timeout)
+
+
+_trace_ctx:contextvars.ContextVar = cache.trace_ctx
+_trace_ids = itertools.count(1)
+_trace_spans:deque = deque(maxlen=10_000)
+_TRACE_FIELDS = ('id', 'parent', 'name', 'caller', 'start', 'wait'
+, 'duration', 'outcome', 'tid')
+
+class TraceSpan:
+	r'''
+	A run-level tracing span: name, caller, start, queue wait,
+	duration, outcome, thread id and parent span.
+	The span becomes the current one in the thread (or async task),
+	so it is the parent of the spans started in it. `thread_start`
+	and `run_task` carry the current span to other threads.
+	Ended spans go to the `app.que_trace` consumer (`trace_writer`)
+	when the *trace* setting is on, see `tasks_trace_print`.
+	*parent* - the parent span id, -1 - the current span.
+	A span costs ~2 µs:
+
+		with TraceSpan('test') as span: pass
+		asrt( bmark(lambda: TraceSpan('t').end()), 3_000 )
+
+	'''
+	__slots__ = ('id', 'parent', 'name', 'caller', 'start', 'wait'
+	, 'outcome', '_perf', '_token')
+	dropped:int = 0
+
+	def __init__(self, name:str, caller:str|None=None
+	, parent:int|None=-1, wait:float=0.0):
+		self.id:int = next(_trace_ids)
+		self.parent:int|None = _trace_ctx.get() if parent == -1 else parent
+		self.name:str = name
+		self.caller:str|None = caller
+		self.wait:float = wait
+		self.outcome:str = 'ok'
+		self.start:float = time.time()
+		self._perf:float = time.perf_counter()
+		self._token = _trace_ctx.set(self.id)
+
+	def end(self, outcome:str|None=None):
+		r'''
+		Ends the span and restores the previous current span.  
+		*outcome* - 'ok', 'error', 'cancelled' etc.  
+		'''
+		duration = time.perf_counter() - self._perf
+		try:
+			_trace_ctx.reset(self._token)
+		except ValueError:
+			pass
+		if outcome: self.outcome = outcome
+		try:
+			que = app.que_trace
+		except (NameError, AttributeError):
+			return
+		if que is None: return
+		span = (self.id, self.parent, self.name, self.caller, self.start
+		, self.wait, duration, self.outcome, threading.get_native_id())
+		_trace_spans.append(span)
+		try:
+			que.put_nowait(span)
+		except queue.Full:
+			TraceSpan.dropped += 1
+
+	def __enter__(self)->'TraceSpan':
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.end('error' if exc_type else None)
+		return False
+
+
+def trace_span_id()->int|None:
+	' Returns the id of the current `TraceSpan` '
+	return _trace_ctx.get()
+
+def trace_writer(fpath:str, max_size:int)->Callable:
+	r'''
+	Returns a consumer for `app.que_trace` that writes spans
+	to the JSONL file *fpath*. When the file reaches *max_size*
+	bytes it is renamed to *fpath.1* (the previous one is
+	deleted) and a new file is started.  
+	'''
+	state = {'file': None, 'size': 0}
+
+	def trace_write(span:tuple):
+		if state['file'] is None:
+			dir_path = os.path.dirname(fpath)
+			if dir_path: os.makedirs(dir_path, exist_ok=True)
+			state['file'] = open(fpath, 'at', encoding='utf-8')
+			state['size'] = state['file'].tell()
+		line = json.dumps(dict(zip(_TRACE_FIELDS, span))) + '\n'
+		state['file'].write(line)
+		state['size'] += len(line)
+		if state['size'] >= max_size:
+			state['file'].close()
+			os.replace(fpath, fpath + '.1')
+			state['file'] = None
+		elif app.que_trace.empty():
+			state['file'].flush()
+
+	return trace_write
+
+def tasks_trace_print(top:int=20, chains:int=5):
+	r'''
+	Prints a summary of the recent spans (the *trace* setting
+	should be on): count, errors, queue wait and duration
+	by span name and the parent chains of the slowest spans.  
+	*top* - number of span names.  
+	*chains* - number of the slowest spans.  
+	'''
+	spans = tuple(_trace_spans)
+	if not spans:
+		qprint('No spans, turn on the *trace* setting')
+		return
+	stats:dict[str, list] = {}
+	for span in spans:
+		st = stats.setdefault(span[2], [0, 0, 0.0, 0.0, 0.0])
+		st[0] += 1
+		if span[7] != 'ok': st[1] += 1
+		st[2] += span[5]
+		st[3] += span[6]
+		if span[6] > st[4]: st[4] = span[6]
+	table = [('Span', 'Count', 'Not ok', 'Wait avg ms', 'Avg ms', 'Max ms')]
+	for name, (count, not_ok, wait, dur, dur_max) in sorted(
+		stats.items(), key=lambda i: i[1][3], reverse=True
+	)[:top]:
+		table.append((name, count, not_ok, round(wait / count * 1000, 2)
+		, round(dur / count * 1000, 2), round(dur_max * 1000, 2)))
+	table_print(table, use_headers=True)
+	by_id = {s[0]: s for s in spans}
+	qprint('Slowest spans:')
+	for span in sorted(spans, key=itemgetter(6), reverse=True)[:chains]:
+		chain = [span[2]]
+		parent = span[1]
+		while parent and (parent_span := by_id.get(parent)):
+			chain.append(parent_span[2])
+			parent = parent_span[1]
+		qprint(f'{span[6] * 1000:.1f} ms ({span[7]}): '
+		+ ' > '.join(reversed(chain)))
+	if TraceSpan.dropped: qprint(f'Dropped spans: {TraceSpan.dropped}')
+
+
+class Histogram:
+	r'''
+	Low-overhead histogram of durations in seconds with fixed buckets.  
+	Percentiles are estimated by linear interpolation inside
+	a bucket.  
+
+		hist = Histogram()
+		for v in (0.001, 0.002, 0.2): hist.add(v)
+		asrt( hist.count, 3 )
+		asrt( hist.percentile(50) <= 0.0025, True )
+		asrt( bmark(hist.add, (0.01,)), 1_500 )
+
+	'''
+	BOUNDS:tuple = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05
+	, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 3600.0)
+
+	def __init__(self)->None:
+		self.counts:list[int] = [0] * (len(self.BOUNDS) + 1)
+		self.count:int = 0
+		self.total:float = 0.0
+		self.max:float = 0.0
+		self._lock = threading.Lock()
+
+	def add(self, value:float):
+		idx = bisect.bisect_left(self.BOUNDS, value)
+		with self._lock:
+			self.counts[idx] += 1
+			self.count += 1
+			self.total += value
+			if value > self.max: self.max = value
+
+	def merge(self, other:'Histogram')->'Histogram':
+		r'''
+		Adds the values of *other* histogram and returns itself.  
+		'''
+		with other._lock:
+			counts = other.counts[:]
+			count, total, vmax = other.count, other.total, other.max
+		with self._lock:
+			for idx, num in enumerate(counts): self.counts[idx] += num
+			self.count += count
+			self.total += total
+			if vmax > self.max: self.max = vmax
+		return self
+
+	def percentile(self, pct:float)->float:
+		r'''
+		Estimated percentile (0-100) in seconds.  
+		'''
+		if not self.count: return 0.0
+		rank = pct / 100 * self.count
+		cum = 0
+		for idx, num in enumerate(self.counts):
+			if not num: continue
+			if cum + num >= rank:
+				low = self.BOUNDS[idx - 1] if idx else 0.0
+				high = self.BOUNDS[idx] if idx < len(self.BOUNDS) else self.max
+				value = low + (high - low) * (rank - cum) / num
+				return min(value, self.max)
+			cum += num
+		return self.max
+
+	def summary(self)->dict:
+		r'''
+		Count, average, maximum and percentiles in seconds.  
+		'''
+		return {
+			'count': self.count
+			, 'avg': self.total / self.count if self.count else 0.0
+			, 'max': self.max
+			, 'p50': self.percentile(50)
+			, 'p95': self.percentile(95)
+			, 'p99': self.percentile(99)
+		}
 class _BmarkInt(int): pass
 
 
@@ -274,11 +1237,26 @@ def _get_parents(limit:int=6)->list:
 _TASK_NAME_SKIP = {'tprint', 'dev_print', 'tdebug', 'con_log', 'dialog'
 , 'msgbox', 'inputbox', 'file_dialog', 'dir_dialog', 'wrapper'
 , 'run', '_bootstrap', '_bootstrap_inner', '<module>'}
+_task_ctx:contextvars.ContextVar = cache.task_ctx
+
+def task_ctx()->tuple[str, str|None]|None:
+	r'''
+	Returns (task function name, caller) of the task that
+	runs in the current thread (or in the thread that started
+	this one with `thread_start`) or `None`.  
+
+		asrt( task_ctx(), None )
+
+	'''
+	return _task_ctx.get()
 
 def task_name(is_human:bool=False, with_parent:bool=False)->str:
 	r'''
 	Gets the name of the task from which it was called.  
 	*with_parent* - get also the first function in stack.  
+	Inside a task the name is taken from `task_ctx`, the stack
+	is walked only for the parent and only until the first
+	function that is not in `_TASK_NAME_SKIP`.  
 
 		asrt( bmark(task_name), 5_000 )
 
@@ -286,6 +1264,20 @@ def task_name(is_human:bool=False, with_parent:bool=False)->str:
 	MAX_LVL = 30
 	global _TASK_NAME_SKIP
 
+	if ctx := _task_ctx.get():
+		tname = ctx[0]
+		if with_parent:
+			for lvl in range(1, MAX_LVL):
+				try:
+					funame = sys._getframe(lvl).f_code.co_name
+				except ValueError:
+					break
+				if funame in _TASK_NAME_SKIP: continue
+				if funame != tname: tname = tname + '>' + funame
+				break
+		if is_human: tname = tname.replace('_', ' ')
+		return tname
+
 	def get_parent()->str:
 		r'''
 		We know that it's a somewhat last resort so it's better
@@ -376,9 +1368,47 @@ def is_dev()->bool:
 	except (NameError, AttributeError):
 		return True
 
+def _log_gzip(fpath:str):
+	r'''
+	Compresses the closed log file to *fpath.gz* and deletes it.  
+	'''
+	try:
+		with open(fpath, 'rb') as fsrc, gzip.open(fpath + '.gz', 'wb') as fdst:
+			shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+		os.remove(fpath)
+	except:
+		qprint(f'error compressing log file: {exc_text()}')
+
+def _log_closed(fpath:str):
+	' The log file was rotated or the date has changed '
+	if sett.log_gzip:
+		thread_start(_log_gzip, args=(fpath,), ident='log gzip')
+
+def _log_rotate(fname:str):
+	r'''
+	Renames the current log file to *fname.N.log* with
+	the first free N and starts a new one.  
+	'''
+	app.log_file[1].close()
+	app.log_file = tuple()
+	fpath = f'{app.dir}\\log\\{fname}.log'
+	num = 1
+	while (
+		os.path.exists(new_path := f'{app.dir}\\log\\{fname}.{num}.log')
+		or os.path.exists(new_path + '.gz')
+	):
+		num += 1
+	try:
+		os.replace(fpath, new_path)
+	except:
+		qprint(f'error rotating log file: {exc_text()}')
+		return
+	_log_closed(new_path)
+
 def _log_file(msg:str, fname:str):
 	r'''
-	Append the string to a log file.  
+	Append the string to a log file and flush it, so
+	a batch of lines is written with one call.  
 	*fname* - log file name.  
 	'''
 	file_obj = None
@@ -388,6 +1418,7 @@ def _log_file(msg:str, fname:str):
 		else:
 			try:
 				app.log_file[1].close()
+				_log_closed(app.log_file[1].name)
 			except Exception as err:
 				tprint(f'error closing previous log file: {repr(err)}'
 				, tname='app')
@@ -395,7 +1426,7 @@ def _log_file(msg:str, fname:str):
 		for _ in (1, 2):
 			try:
 				file_obj = open(f'{app.dir}\\log\\{fname}.log', 'ta+'
-				, encoding='utf-8', buffering=1)
+				, encoding='utf-8')
 				break
 			except FileNotFoundError:
 				dev_print('make log dir')
@@ -407,18 +1438,92 @@ def _log_file(msg:str, fname:str):
 		app.log_file = (fname, file_obj)
 	try:
 		file_obj.write(msg)
+		file_obj.flush()
 	except Exception as err:
 		qprint(f'error logging to file: {exc_text()}')
 		return
+	if app.log_max_size and file_obj.tell() >= app.log_max_size:
+		_log_rotate(fname)
 
-def _tlog(now_msgs:tuple[dtime, tuple]):
-	log_memory:list = app.log_memory
-	msg = ' '.join(map(str, now_msgs[1]))
-	log_memory.append((now_msgs[0].replace(microsecond=0).isoformat(), msg))
-	del log_memory[:-_APP_LOG_LIMIT]
-	msg = now_msgs[0].strftime(_LOG_TIME_FORMAT) + ' ' + msg + '\n'
-	fname = now_msgs[0].strftime(sett.log_file_name)
-	_log_file(msg=msg, fname=fname)
+class LogRing:
+	r'''
+	A fixed-capacity ring buffer for the in-memory log. Every entry
+	gets a sequence number that only grows, so a reader can ask
+	only for the new entries with `since`.
+
+		ring = LogRing(capacity=3)
+		for i in range(5): ring.append(('t', str(i)))
+		asrt( ring.since(0), [(3, 't', '2'), (4, 't', '3'), (5, 't', '4')] )
+		asrt( ring.since(4), [(5, 't', '4')] )
+		asrt( ring.since(3, limit=1), [(4, 't', '3')] )
+		asrt( ring.since(9), ring.since(0) )
+		asrt( ring.poll(5), (5, []) )
+		asrt( bmark(ring.append, (('t', 'm'),)), 1_000 )
+
+	'''
+	def __init__(self, capacity:int=_APP_LOG_LIMIT):
+		self.capacity:int = capacity
+		self._buf:list = [None] * capacity
+		self._lock = threading.Lock()
+		self.last_seq:int = 0
+
+	def append(self, entry:tuple[str, str]):
+		' Adds a (time, message) entry '
+		with self._lock:
+			self.last_seq += 1
+			self._buf[self.last_seq % self.capacity] = (self.last_seq, *entry)
+
+	def since(self, seq:int=0, limit:int=0)->list[tuple[int, str, str]]:
+		r'''
+		Returns (seq, time, message) entries with the sequence
+		number greater than *seq*, oldest first.  
+		*limit* - maximum number of entries, 0 - no limit.  
+		A *seq* greater than the last one (the app was restarted)
+		is treated as 0, so the reader gets everything again.  
+		'''
+		return self.poll(seq, limit)[1]
+
+	def poll(self, seq:int=0, limit:int=0
+	)->tuple[int, list[tuple[int, str, str]]]:
+		r'''
+		Same as `since`, but also returns the *seq* for the next
+		call: of the last entry or the current last one.  
+		'''
+		with self._lock:
+			last = self.last_seq
+			if seq > last: seq = 0
+			first = max(seq, last - self.capacity, 0) + 1
+			if limit: last = min(last, first + limit - 1)
+			return last, [
+				self._buf[s % self.capacity] for s in range(first, last + 1)
+			]
+
+	def __len__(self)->int:
+		return min(self.last_seq, self.capacity)
+
+	def __iter__(self):
+		return (e[1:] for e in self.since())
+
+
+def _tlog(batch:list[tuple[dtime, tuple]]):
+	r'''
+	Consumer of `app.que_log`: gets all the messages that came
+	during *log_flush* and writes them with one call per file.  
+	'''
+	lines = []
+	fname = ''
+	for now, msgs in batch:
+		msg = ' '.join(map(str, msgs))
+		app.log_memory.append(
+			(now.replace(microsecond=0).isoformat(), msg)
+		)
+		cur_fname = now.strftime(sett.log_file_name)
+		if cur_fname != fname:
+			if lines: _log_file(msg=''.join(lines), fname=fname)
+			lines = []
+			fname = cur_fname
+		lines.append(now.strftime(_LOG_TIME_FORMAT) + ' ' + msg + '\n')
+	if lines: _log_file(msg=''.join(lines), fname=fname)
 
 def tlog(*msgs):
 	r'''
@@ -702,6 +1807,57 @@ def date_fill(date_dic:dict, cur_date=None)->dtime:
 		new_date_dic['day'] = 28 
 		return datetime.datetime(**new_date_dic)
 
+def date_next(date_dic:dict, cur_date:dtime|None=None)->dtime|None:
+	r'''
+	Returns the nearest minute that is not earlier than *cur_date*
+	and matches the *date_dic* like in `date_fill` (`None` is a
+	wildcard). If the month does not have such a day, the 28th is
+	used, as `date_fill` does.  
+	Returns `None` if there is no such date.  
+
+		dt_dic = {'year': None, 'month': None
+		, 'day': 1, 'hour': 12, 'minute': 30}
+		asrt( date_next(dt_dic, dtime(2024, 1, 31, 20, 0))
+		, dtime(2024, 2, 1, 12, 30) )
+		asrt( date_next(dt_dic, dtime(2024, 2, 1, 12, 30))
+		, dtime(2024, 2, 1, 12, 30) )
+		dt_dic = {'year': None, 'month': 2
+		, 'day': 30, 'hour': 0, 'minute': 0}
+		asrt( date_next(dt_dic, dtime(2024, 3, 1))
+		, dtime(2025, 2, 28, 0, 0) )
+		asrt( bmark(date_next, (dt_dic,)), 20_000 )
+
+	'''
+	YEARS_AHEAD = 9
+	if cur_date is None: cur_date = datetime.datetime.now()
+	start = cur_date.replace(second=0, microsecond=0)
+	if start < cur_date: start += datetime.timedelta(minutes=1)
+	start_t = start.timetuple()[:5]
+
+	def values(part:str, first:int, last:int):
+		if (val := date_dic[part]) is None: return range(first, last + 1)
+		return (val,)
+
+	for year in values('year', start.year, start.year + YEARS_AHEAD):
+		if year < start_t[0]: continue
+		for month in values('month', 1, 12):
+			if (year, month) < start_t[:2]: continue
+			last_day = calendar.monthrange(year, month)[1]
+			if (day := date_dic['day']) is None:
+				days = range(1, last_day + 1)
+			else:
+				days = (day if day <= last_day else 28,)
+			for day in days:
+				if (year, month, day) < start_t[:3]: continue
+				for hour in values('hour', 0, 23):
+					if (year, month, day, hour) < start_t[:4]: continue
+					for minute in values('minute', 0, 59):
+						if (year, month, day, hour, minute) < start_t:
+							continue
+						return datetime.datetime(year, month, day, hour
+						, minute)
+	return None
+
 def date_fill_str(date_str:str)->str:
 	r'''
 	Replace asterisk to current datetime value:  
@@ -983,6 +2139,9 @@ def _msg_err(msg:str, icon:int, title:str, parent:str, timeout:str):
 		tcon.TD_ICON_WARNING: r'c:\Windows\System32\SecurityAndMaintenance_Alert.png'
 		, tcon.TD_ICON_ERROR: r'c:\Windows\System32\SecurityAndMaintenance_Error.png'
 	}
+	if sys.platform != 'win32':
+		con_log(f'{parent}{" (" + title + ")" if title else ""}: {msg}')
+		return
 	if not is_con():
 		try:
 			if sett.kiosk:
@@ -1103,7 +2262,7 @@ def inputbox(message:str, title:str='', is_pwd:bool=False, default:str=''
 	*is_pwd* - use password dialog (hide input).  
 	*lang* - switch keyboard to specific language like 'en-us'.  
 	'''
-	if is_con():
+	if is_con() or is_headless():
 		if is_pwd:
 			return getpass.getpass(f'inputbox ({message}): ')
 		else:
@@ -1163,7 +2322,7 @@ def file_dialog(title:str=None, multiple:bool=False
 		title = func_name_human(task_name())
 	else:
 		title = str(title)
-	if is_con(): return input(f'File dialog ({title}): ')
+	if is_con() or is_headless(): return input(f'File dialog ({title}): ')
 	style = wx.FD_OPEN | wx.FD_FILE_MUST_EXIST
 	if multiple: style |= wx.FD_MULTIPLE
 	if on_top: style |= wx.STAY_ON_TOP
@@ -1193,7 +2352,7 @@ def dir_dialog(title:str=None, default_dir:str='', on_top:bool=True
 		title = func_name_human(task_name())
 	else:
 		title = str(title)
-	if is_con(): return input(f'Dir dialog ({title}): ')
+	if is_con() or is_headless(): return input(f'Dir dialog ({title}): ')
 	style = wx.DD_DEFAULT_STYLE
 	if must_exist: style |= wx.DD_DIR_MUST_EXIST
 	if on_top: style |= wx.STAY_ON_TOP
@@ -1364,6 +2523,26 @@ def qprint(*values):
 	except:
 		print('<qprint fail>', msg)
 
+def _print_batch(msgs:list):
+	' Consumer of `app.que_print`: prints a batch with one call '
+	print(*msgs, sep='\n')
+
+_TPRINT_TIME:tuple[int, str] = (0, '')
+
+def _tprint_time()->str:
+	r'''
+	The current time for `tprint`, formatted once per second.  
+
+		asrt( bmark(_tprint_time), 300 )
+
+	'''
+	global _TPRINT_TIME
+	sec = int(time.time())
+	if _TPRINT_TIME[0] != sec:
+		_TPRINT_TIME = (sec
+		, time.strftime('%y.%m.%d %H:%M:%S', time.localtime(sec)))
+	return _TPRINT_TIME[1]
+
 def tprint(*msgs, tname:str|None=None, short:bool=False, with_parent:bool=False):
 	r'''
 	Prints the message(s) with the task name and time.  
@@ -1384,7 +2563,7 @@ def tprint(*msgs, tname:str|None=None, short:bool=False, with_parent:bool=False)
 				msg = ''.join(('[', tname, '] ', msg))
 			else:
 				msg = ''.join(('[', tname, '] ', msg))
-	msg = ''.join((time.strftime('%y.%m.%d %H:%M:%S'), ' ', msg))
+	msg = ''.join((_tprint_time(), ' ', msg))
 	if short:
 		qprint( str_short(msg) )
 	else:
@@ -1400,6 +2579,18 @@ def is_con()->bool:
 	'''
 	return hasattr(sys, 'ps1')
 
+def is_headless()->bool:
+	r'''
+	Is the app started with the *-headless* option, i.e. without
+	the tray icon and wx? Dialogs then fall back to the console.
+
+		asrt( bmark(is_headless), 400 )
+
+	'''
+	return _HEADLESS
+
+_HEADLESS = '-headless' in sys.argv
+
 def tdebug(*msgs, **kwargs)->bool:
 	r'''
 	Does the code execute from the console?  
@@ -1427,7 +2618,7 @@ def balloon(msg:str, title:str=APP_NAME, timeout:int=None, icon:str=None):
 		icon - 'info', 'warning' or 'error'.
 	'''
 	kwargs = {'title': title, 'text': msg}
-	if is_con():
+	if is_con() or is_headless():
 		tprint('<balloon>:', msg)
 		return
 	if timeout: kwargs['msec'] = timeout * 1000
@@ -1448,7 +2639,20 @@ def app_log()->list[tuple[str, str ]]:
 		http://127.0.0.1:8275/log
 	
 	'''
-	return app.log_memory
+	return list(app.log_memory)
+
+def app_log_since(seq:int=0, limit:int=0)->list[tuple[int, str, str]]:
+	r'''
+	Returns the log entries newer than the sequence number *seq*
+	as tuples with *seq:int*, *time:str* and *message:str*.
+	Pass the last *seq* to the next call to get only new entries.  
+	*limit* - maximum number of entries, 0 - no limit.  
+	It is also used in the HTTP server:  
+
+		http://127.0.0.1:8275/log?since=1200&limit=100
+
+	'''
+	return app.log_memory.since(seq, limit)
 
 def decor_except(func):
 	''' Add 'try... except' for function
@@ -2126,6 +3330,7 @@ def xml_to_dict(xml_str:str, remove_str:str=None)->tuple:
 	Converts a XML to dictionary using lxml.etree
 	Returns (True, dict) or (False, 'exception text')
 	'''
+	import lxml.etree
 	try:
 		if remove_str: xml_str = xml_str.replace(remove_str, '')
 		parser=lxml.etree.XMLParser(recover=True)
@@ -2228,7 +3433,8 @@ def _thread_pop(src:str, tid:int):
 def thread_start(func, args:tuple=(), kwargs:dict={}
 , is_daemon:bool=True, err_msg:bool=False, ident:str=''
 , err_action:Callable|None=None
-, priority:int=win32con.THREAD_PRIORITY_NORMAL)->threading.Thread:
+, priority:int=win32con.THREAD_PRIORITY_NORMAL
+, context:bool=True)->threading.Thread:
 	r'''
 	Runs function in a thread. Returns thread object  
 	*is_daemon* - thread runs in the background and is terminated
@@ -2237,6 +3443,9 @@ def thread_start(func, args:tuple=(), kwargs:dict={}
 	*ident* - user-defined identifier of thread.  
 	*err_action* - function to run if an exception occurs.  
 	The text of exception will be passed to the function.  
+	*context* - run in a copy of the caller context (the task
+	and the trace span). Long-lived threads that serve many
+	jobs (pools, queues) should not take it.  
 
 		asrt( bmark(thread_start, (lambda: None,)), 500_000 )
 		asrt( bmark(threading.get_ident), 400 )
@@ -2274,13 +3483,49 @@ def thread_start(func, args:tuple=(), kwargs:dict={}
 		parents.append(func.__name__)
 		ident = '>'.join(parents)
 	if err_action is None: err_action = err_handler
-	thread = threading.Thread(target=wrapper, daemon=is_daemon
-	, name=func.__name__)
+	ctx = contextvars.copy_context() if context else None
+	thread = threading.Thread(
+		target=(lambda: ctx.run(wrapper)) if ctx else wrapper
+		, daemon=is_daemon, name=func.__name__
+	)
 	thread.start()
 	if priority != win32con.THREAD_PRIORITY_NORMAL:
 		thread_priority_set(thread.native_id, priority=priority)
 	return thread
 
+_async_lock = threading.Lock()
+
+def async_loop()->'asyncio.AbstractEventLoop':
+	r'''
+	Returns the app-wide asyncio event loop. The loop runs
+	in its own thread, that is started on the first call,
+	and survives the crontab reload.  
+	'''
+	with _async_lock:
+		if cache.async_loop is None:
+			loop = asyncio.new_event_loop()
+			thread_start(loop.run_forever, ident='app: asyncio loop'
+			, context=False)
+			cache.async_loop = loop
+	return cache.async_loop
+
+def async_run(coro)->concurrent.futures.Future:
+	r'''
+	Schedules the coroutine on the app-wide event loop.
+	Can be called from any thread. Returns
+	a `concurrent.futures.Future`, use `future.result()`
+	to wait for the result.  
+
+		async def _ar_test():
+			await asyncio.sleep(0.01)
+			return 1
+
+		asrt( async_run(_ar_test()).result(), 1 )
+		asrt( bmark(lambda: async_run(_ar_test()).result()), 20_000_000, '<' )
+
+	'''
+	return asyncio.run_coroutine_threadsafe(coro, async_loop())
+
 def thread_priority_get(native_id:int|None=None)->None|int:
 	r'''
 	Gets own thread priority.  
@@ -2332,6 +3577,19 @@ def task_start(taskname:str|Callable, **kwargs):
 		raise Exception('Task not found')
 	app.tasks.run_task(tname, **kwargs)
 
+def task_cancel(taskname:str|Callable, reason:str='cancelled')->bool:
+	r'''
+	Cancels the last run of the task: sets its `CancelToken`
+	and kills the worker of a task with *isolate=True*.
+	Returns False if the task is not running.  
+	'''
+	if isinstance(taskname, Callable): taskname = taskname.__name__
+	task = app.tasks.task_dict.get(taskname)
+	if not task: raise Exception('Task not found')
+	if not task['running'] or not (token := task['_cancel']): return False
+	token.cancel(reason)
+	return True
+
 def app_threads_print():
 	thread: threading.Thread
 	table = [('TID', 'Dmn', 'Start time', 'Running time'
@@ -2374,6 +3632,31 @@ def app_threads_print():
 	qprint(f'app		{tnum_app} (dead: {tnum_dead})')
 	qprint(f'threading	{tnum_thread} ({tnum_thread - tnum_app})')
 	qprint(f'system		{tnum_sys} ({tnum_sys - tnum_app})\n')
+	for lane, pool in getattr(app, 'task_pools', {}).items():
+		st = pool.stats()
+		qprint(
+			f'Task pool ({lane}): workers {st["workers"]}/{pool.max_workers}'
+			+ f', queued {st["queued"]}, pending {st["pending"]}'
+			+ f', jobs {st["jobs"]}'
+			+ f', wait avg/max {st["wait_avg"] * 1000:.1f}'
+			+ f'/{st["wait_max"] * 1000:.1f} ms'
+			+ f', run avg {st["run_avg"] * 1000:.1f} ms\n'
+		)
+	if (pool := getattr(app, 'proc_pool', None)) and pool._handlers:
+		st = pool.stats()
+		qprint(
+			f'Process pool: workers {st["workers"]}/{pool.size}'
+			+ f', busy {st["busy"]}, queued {st["queued"]}'
+			+ f', jobs {st["jobs"]}, recycled {st["recycled"]}'
+			+ f', killed {st["killed"]}\n'
+		)
+	for name in ('que_print', 'que_log', 'que_hook', 'que_trace'):
+		if not isinstance(que := getattr(app, name, None), TQueue): continue
+		st = que.stats()
+		qprint(
+			f'Queue {name} ({que.overflow}): depth {st["depth"]}/{que.maxsize}'
+			+ f', high-water {st["high_water"]}, dropped {st["dropped"]}'
+		)
 
 def crontab_reload(with_cache:bool=False)->bool:
 	r'''
@@ -2413,6 +3696,23 @@ def app_tasks_print():
 	'''
 	app.tasks.tasks_print()
 
+def app_imports_print(top:int=20):
+	r'''
+	Prints the slowest imports: the startup imports and the
+	lazy imports after it (see `lazy_import`).  
+	Works only if the app is started with the *-dev* option.  
+	'''
+	if not (imt := sys.modules.get('plugins.import_time')):
+		qprint('Start the app with the -dev option to measure the imports')
+		return
+	table = [('Module', 'Self, ms', 'Total, ms', 'Depth')]
+	table.extend(imt.report(top))
+	table_print(table, use_headers=True)
+	total_ms = sum(r[1] for r in imt.report())
+	rss_mb = psutil.Process().memory_info().rss // 1_048_576
+	qprint(f'Imports: {len(imt.records)} modules, {total_ms:.0f} ms'
+	+ f', memory: {rss_mb} MB')
+
 def app_enable():
 	r'''
 	Enabling the application
@@ -2510,16 +3810,29 @@ def toast(msg:str|tuple|list, dur:str='default', img:str=''
 	del newToast
 
 def bmark(func, a:tuple=(), ka:dict={}, b_iter:int=10
-, do_print:bool=True)->int:
+, do_print:bool=True, warmup:int=0, b_time:float=0.2
+, mem:bool=False)->int:
 	r'''
-	Runs the `func` `b_iter` times and returns the number of
-	nanoseconds per cycle.  
+	Runs the `func` `b_iter` times and returns the median number of
+	nanoseconds per cycle. The result is an `int` with attributes:
+	*p90*, *p99*, *ci* (95% confidence interval of the median),
+	*loops* and with *mem=True* — *peak* and *net* (bytes per call).  
+	*warmup* - number of calls before the measurement.  
+	*b_iter* - 0: calibrate the number of loops to take
+	about *b_time* seconds (10..100_000).  
+	*mem* - measure the allocations with `tracemalloc` in a separate
+	pass: the peak and the net (not freed) size per call.  
 	Example:
 
 		asrt( bmark(lambda i: i+1, a=(1,), b_iter=10 ) , 2_000 )
 		asrt( bmark(time.perf_counter_ns), 500 )
 		# median=400 ns/loop, best=400, worst=1_400, total=5_100, 10 loops
-	
+		res = bmark(lambda: [0] * 1000, b_iter=0, warmup=10, mem=True)
+		# median=1_600 ns/loop, best=1_400, worst=32_100, total=206_212_500, 100_000 loops
+		# p90=1_900, p99=3_100, ci95=1_600..1_600, peak=8_056 B, net=0 B
+		asrt( res.peak, 8_056, '<' )
+
+	See also `bmark_ab`.  
 	'''
 	
 	def arg_to_str(arg)->str:
@@ -2552,29 +3865,111 @@ def bmark(func, a:tuple=(), ka:dict={}, b_iter:int=10
 	ASRT_COEF = 1.2
 	if not is_iter(a): a = (a,)
 	assert isinstance(ka, dict), '*ka* should be a dictionary'
-	timings:list = []
-	for _ in range(b_iter):
-		start = time.perf_counter_ns()
-		func(*a, **ka)
-		timings.append(time.perf_counter_ns() - start)
-	ns_median:int = int(median(timings))
+	res = _bmark_run(func, a, ka, b_iter, warmup, b_time, mem)
 	name = func.__name__
 	if do_print:
-		ns_max = max(timings)
 		qprint(
 			'median={} ns/loop, best={}, worst={}, total={}, {} loops'.format(
 				*map(int_str, (
-					ns_median, min(timings), ns_max, sum(timings), b_iter
+					res, res.best, res.worst, res.total, res.loops
 				))
 			)
 		)
+		if res.loops >= 10:
+			stats = 'p90={}, p99={}, ci95={}..{}'.format(
+				*map(int_str, (res.p90, res.p99, *res.ci))
+			)
+			if mem:
+				stats += ', peak={} B, net={} B'.format(
+					int_str(res.peak), int_str(res.net))
+			qprint(stats)
 		args = []
 		for arg in a: args.append(arg_to_str(arg))
 		args = f", ({', '.join(args)},)" if args else ''
-		round_digit = len(str(ns_median)) - 2
+		round_digit = len(str(int(res))) - 2
 		qprint(f'asrt( bmark({name}{args})'
-		+ f", {int_str(round(ns_median * ASRT_COEF, -round_digit))} )")
-	return _BmarkInt(ns_median)
+		+ f", {int_str(round(res * ASRT_COEF, -round_digit))} )")
+	return res
+
+def _bmark_run(func, a:tuple, ka:dict, b_iter:int, warmup:int
+, b_time:float, mem:bool)->'_BmarkInt':
+	' Measures for `bmark` and `bmark_ab` '
+	for _ in range(warmup): func(*a, **ka)
+	if not b_iter:
+		start = time.perf_counter_ns()
+		func(*a, **ka)
+		single = max(time.perf_counter_ns() - start, 1)
+		b_iter = min(max(int(b_time * 1e9 / single), 10), 100_000)
+	timings:list = []
+	for _ in range(b_iter):
+		start = time.perf_counter_ns()
+		func(*a, **ka)
+		timings.append(time.perf_counter_ns() - start)
+	timings.sort()
+	res = _BmarkInt(median(timings))
+	res.loops = b_iter
+	res.best, res.worst, res.total = timings[0], timings[-1], sum(timings)
+	res.p90 = timings[min(int(b_iter * 0.9), b_iter - 1)]
+	res.p99 = timings[min(int(b_iter * 0.99), b_iter - 1)]
+	half = 0.98 * b_iter ** 0.5
+	res.ci = (
+		timings[max(int(b_iter / 2 - half), 0)]
+		, timings[min(int(b_iter / 2 + half), b_iter - 1)]
+	)
+	res.peak = res.net = 0
+	if mem:
+		import tracemalloc
+		was_tracing = tracemalloc.is_tracing()
+		if not was_tracing: tracemalloc.start()
+		mem_iter = min(b_iter, 1000)
+		peak = 0
+		start_size = tracemalloc.get_traced_memory()[0]
+		for _ in range(mem_iter):
+			tracemalloc.reset_peak()
+			before = tracemalloc.get_traced_memory()[0]
+			func(*a, **ka)
+			peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+		res.peak = peak
+		res.net = max(tracemalloc.get_traced_memory()[0] - start_size, 0) \
+			// mem_iter
+		if not was_tracing: tracemalloc.stop()
+	return res
+
+def bmark_ab(func_a, func_b, a:tuple=(), ka:dict={}, b_iter:int=0
+, rounds:int=5, warmup:int=10, do_print:bool=True)->float:
+	r'''
+	A/B comparison of two callables with the same arguments.
+	They are measured in alternating *rounds*, so a change of
+	the CPU frequency affects both of them.
+	Returns the ratio of the medians B / A: < 1 — B is faster.
+	The difference is significant if the confidence intervals
+	of the medians do not overlap.  
+
+		asrt( bmark_ab(lambda: '%s' % 1, lambda: f'{1}'), 1.0, '<' )
+
+	'''
+	if not is_iter(a): a = (a,)
+	runs:dict[str, list] = {'a': [], 'b': []}
+	for _ in range(rounds):
+		for key, func in (('a', func_a), ('b', func_b)):
+			runs[key].append(
+				_bmark_run(func, a, ka, b_iter, warmup, 0.05, False)
+			)
+	med_a = median(runs['a'])
+	med_b = median(runs['b'])
+	ratio = med_b / (med_a or 1)
+	if do_print:
+		ci_a = (min(r.ci[0] for r in runs['a']), max(r.ci[1] for r in runs['a']))
+		ci_b = (min(r.ci[0] for r in runs['b']), max(r.ci[1] for r in runs['b']))
+		significant = ci_b[1] < ci_a[0] or ci_a[1] < ci_b[0]
+		for key, func, med, ci in (
+			('A', func_a, med_a, ci_a), ('B', func_b, med_b, ci_b)
+		):
+			qprint(f'{key}: {func.__name__} median={int_str(int(med))} ns'
+			+ f', ci95={int_str(ci[0])}..{int_str(ci[1])}')
+		qprint(f'B/A = {ratio:.3f}'
+		+ ('' if significant else ' (the difference is not significant)'))
+	return ratio
 
 def median(source):
 	r'''
@@ -3178,12 +4573,13 @@ def func_arg(func:Callable)->tuple:
 
 def sys_ver()->float:
 	r'''
-	Windows version as a number.  
+	Windows version as a number, 0.0 on other systems.  
 	https://learn.microsoft.com/en-us/windows/win32/sysinfo/operating-system-version  
 
 		asrt( bmark(sys_ver), 79_000 )
 
 	'''
+	if sys.platform != 'win32': return 0.0
 	ver = sys.getwindowsversion()
 	return ver.major + ver.minor / 10
 
@@ -3236,6 +4632,22 @@ def run_in_process(func):
 
 	return wrapper
 
+def proc_pool_submit(func:Callable, *args, **kwargs
+)->concurrent.futures.Future:
+	r'''
+	Runs the function in a worker of the process pool and returns
+	a `concurrent.futures.Future`. Unlike `run_in_process` the
+	workers are already started and have the crontab and
+	plugins imported, so a call costs milliseconds.  
+	Caveats are the same as in `run_in_process`. An exception
+	in the function is raised by `Future.result` as `ProcPoolError`.  
+
+		asrt( proc_pool_submit(pow, 2, 10).result(), 1024 )
+		asrt( bmark(lambda: proc_pool_submit(pow, 2, 10).result()), 1_000_000, '<' )
+
+	'''
+	return app.proc_pool.submit(func, args, kwargs)
+
 def size_int(size:str|tuple, dst_unit:str='b')->int:
 	r'''
 	Converts a string with size to an number of the desired unit of measure.  
@@ -3333,11 +4745,21 @@ def dict_str(dct:dict, template:str='{}: {}'
 	if short > 0: lines = list(str_short(l, short) for l in lines)
 	return line_sep.join(lines)
 
-def _init():
-	if __builtins__.get('gdic', None) != None: return
-	__builtins__['gdic'] = {}
-	if not is_con(): return
-	app:wx.App = wx.App()
+def _init(force:bool=False):
+	r'''
+	Creates a minimal `app` for the interactive console.  
+	*force* - create it outside the console too, e.g. in
+	the *plugins.bench* runner. Such an `app` is a plain
+	namespace, not a *wx.App*, so no GUI is created.  
+	'''
+	if not force:
+		if __builtins__.get('gdic', None) != None: return
+		__builtins__['gdic'] = {}
+		if not is_con(): return
+	elif 'app' in __builtins__:
+		return
+	__builtins__.setdefault('gdic', {})
+	app:wx.App = types.SimpleNamespace() if force else wx.App()
 	setattr(app, 'que_print', TQueue(consumer=print))
 	setattr(app, 'que_log', TQueue(consumer=lambda t: None) )
 	setattr(app, 'dir', os.getcwd())
@@ -1,3 +1,4 @@
+import uuid
 import ctypes
 from ctypes import wintypes
 
@@ -24,9 +25,13 @@ class GUID(ctypes.Structure):
 	def __init__(self, s: str = None):
 		super().__init__()
 		if s is not None:
-			hr = ole32.CLSIDFromString(wintypes.LPCWSTR(s), ctypes.byref(self))
-			if hr != 0:
-				raise OSError(f'CLSIDFromString({s!r}) failed: 0x{hr & 0xFFFFFFFF:08X}')
+			# Parsed in Python, so it works without ole32 too:
+			try:
+				uid = uuid.UUID(s)
+			except ValueError:
+				raise OSError(f'invalid GUID: {s!r}')
+			self.Data1, self.Data2, self.Data3 = uid.fields[:3]
+			self.Data4[:] = uid.bytes[8:]
 
 
 ole32.CLSIDFromString.restype  = ctypes.HRESULT
@@ -6,6 +6,7 @@ class Language:
 		self.button_cancel = 'Cancel'
 		self.menu_exit = 'Exit'
 		self.load_crontab = 'Load crontab from folder'
+		self.load_crontab_done = 'Crontab loaded in {}'
 		self.load_homepage = 'Homepage: https://github.com/vikilpet/Taskopy'
 		self.load_donate = 'Donate if you like it: https://www.paypal.me/vikil'
 		self.menu_edit_crontab = 'Edit crontab'
@@ -27,6 +28,7 @@ class Language:
 		self.warn_runn_tasks_con = 'Running tasks'
 		self.warn_runn_tasks_msg = 'Some tasks ({}) are being performed now. Close anyway?'
 		self.warn_date_format = 'Wrong date format in task «{}»: «{}»'
+		self.warn_burst = 'Wrong debounce or throttle format in task «{}»: «{}»'
 		self.warn_event_format='Error subscribing to events in task «{}»: «{}»'
 		self.warn_too_many_win = 'Too many {} windows was found: {}'
 		self.warn_no_run_tasks = 'No running tasks'
@@ -70,6 +72,7 @@ class Language:
 
 _dict_ru='''
 load_crontab=Загрузка кронтаба из папки
+load_crontab_done=Кронтаб загружен за {}
 load_homepage=Домашняя страница: https://vikilpet.wordpress.com/taskopy/
 load_donate=Благодарю за использование.
 menu_edit_crontab=Редактировать кронтаб
@@ -93,6 +96,7 @@ warn_left_click=Попытка привязать левому клику бол
 warn_runn_tasks_con=Работающие задачи
 warn_runn_tasks_msg=Некоторые задачи ({} шт.) выполняются в текущий момент. Всё равно закрыть?
 warn_date_format=Неправильный формат даты в задаче «{}»: «{}»
+warn_burst=Неправильный формат debounce или throttle в задаче «{}»: «{}»
 warn_event_format=Ошибка подписки на события в задаче «{}»: «{}»
 warn_too_many_win=Открыто слишком много окон {}: {}
 button_close=Закрыть
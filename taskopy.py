@@ -1,14 +1,21 @@
 
 import time
 import sys
+if '-dev' in sys.argv:
+	import plugins.import_time
+	plugins.import_time.start()
 import os
 import importlib
 import traceback
 import threading
 import inspect
 import types
-import wx.adv
-import wx
+HEADLESS = '-headless' in sys.argv
+if not HEADLESS:
+	import wx.adv
+	import wx
+import plugins.portable
+plugins.portable.install()
 import schedule
 import keyboard
 import win32api
@@ -19,6 +26,8 @@ from win32con import VK_MENU, VK_SHIFT, VK_CONTROL, WM_KEYDOWN, WM_KEYUP \
 import win32file
 import win32evtlog
 import gc
+import heapq
+import hashlib
 import argparse
 import msvcrt
 import queue
@@ -26,12 +35,12 @@ import pythoncom
 import plugins.winapi as winapi
 from plugins.constants import *
 from plugins.tools import *
-from plugins.tools import _tlog, _thread_pop
+from plugins.tools import _tlog, _thread_pop, _print_batch
 from plugins.plugin_filesystem import *
 from plugins.plugin_system import *
 from plugins.plugin_system import _idle_millis
 from plugins.plugin_process import *
-from plugins.plugin_http_server import http_server_start
+from plugins.plugin_http_server import http_server_start, HTTPRoutes
 from plugins.plugin_hotkey import GlobalHotKeys
 from resources.languages import Language
 
@@ -46,12 +55,25 @@ APP_SETTINGS = (
 	, ('editor', 'notepad.exe')
 	, ('server_ip', '127.0.0.1')
 	, ('server_port', 8275)
+	, ('server_backend', 'thread')
+	, ('server_workers', 16)
+	, ('server_keep_alive', '15 sec')
 	, ('white_list', '127.0.0.1')
 	, ('server_silent', True)
 	, ('hide_console', False)
 	, ('kiosk', False)
 	, ('kiosk_key', 'shift')
 	, ('log_file_name', tcon.DATE_STR_FILE_SHORT)
+	, ('log_flush', '500 ms')
+	, ('log_max_size', '')
+	, ('log_gzip', False)
+	, ('task_pool_size', 32)
+	, ('proc_pool_size', 0)
+	, ('proc_pool_max_jobs', 500)
+	, ('proc_pool_max_mem', '1 gb')
+	, ('trace', False)
+	, ('trace_file', 'log\\trace.jsonl')
+	, ('trace_max_size', '10 mb')
 )
 TASK_OPTIONS = (
 	('task_name', None)
@@ -109,6 +131,20 @@ TASK_OPTIONS = (
 	, ('on_any_key', False)
 	, ('_tid', False)
 	, ('_caller', '')
+	, ('max_concurrency', 0)
+	, ('_stats', {})
+	, ('cache_ttl', None)
+	, ('_cache', {})
+	, ('_cache_hits', 0)
+	, ('_cache_misses', 0)
+	, ('debounce', None)
+	, ('throttle', None)
+	, ('_burst', None)
+	, ('process', False)
+	, ('_async', False)
+	, ('priority', None)
+	, ('isolate', False)
+	, ('_cancel', None)
 )
 _WEEKDAY_HUMAN = {
 	'day': 'day'
@@ -152,9 +188,40 @@ sett:Settings = Settings(ini_file='')
 lang:Language = None
 
 PLUGIN_SOURCE = 'plugins\\*.py'
+_TASK_ERROR = '<task error>'
+_CACHE_MAX = 1024
 
 
 
+class _CacheFlight(threading.Event):
+	r'''
+	A run of a task with the *cache_ttl* option. It is passed
+	to `Tasks.run_task` as *wait_event*, so when the run is over,
+	the result is saved in the cache entry and given to all
+	the runs that were waiting for it.  
+	'''
+
+	def __init__(self, entry:dict, ttl:float, lock:threading.Lock):
+		super().__init__()
+		self.entry = entry
+		self.ttl = ttl
+		self.lock = lock
+		self.result:list = []
+
+	def set(self):
+		value = self.result[0] if self.result else None
+		with self.lock:
+			self.entry['value'] = value
+			self.entry['done'] = True
+			if value != _TASK_ERROR:
+				self.entry['expires'] = time.monotonic() + self.ttl
+			waiters, self.entry['waiters'] = self.entry['waiters'], []
+		for result, wait_event in waiters:
+			result.append(value)
+			if wait_event: wait_event.set()
+		super().set()
+
+
 class HookKB:
 
 	def __init__(self):
@@ -340,11 +407,11 @@ class Tasks:
 		self.task_list_left_click = []
 		self.task_list_sys_startup = []
 		self.task_list_http = []
+		self.http_routes:HTTPRoutes = HTTPRoutes([])
 		self.task_list_idle = []
 		self.task_list_crontab_load = []
 		self.task_list_exit = []
-		self.dir_change_stop = {}
-		self.event_handlers:list = []
+		self.listeners:dict[tuple, Callable] = {}
 		self.idle_min:int = 0
 		self.http_server = None
 		self.global_hk:GlobalHotKeys = None
@@ -353,6 +420,16 @@ class Tasks:
 		self.version:str = dtime.now().strftime('%Y.%m.%d %H:%M:%S.%f')
 		self.on_any_key:list = []
 		self._is_alive:bool = True
+		self._timers:list[tuple] = []
+		self._timers_lock = threading.Lock()
+		self._timer_seq:int = 0
+		self._timers_cancelled:set[int] = set()
+		self._sched_wake = threading.Event()
+		self._sched_check:bool = True
+		self._idle_prev:float = 0.0
+		self._cache_lock = threading.Lock()
+		self._burst_lock = threading.Lock()
+		options_cache:dict = {}
 		for task_func_name in dir(crontab):
 			if task_func_name.startswith('_'): continue
 			task_func = getattr(crontab, task_func_name)
@@ -361,17 +438,12 @@ class Tasks:
 				(not getattr(task_func, TASK_ATTR, False))
 				and (task_func.__module__ != 'crontab')
 			): continue
-			task:dict = dict()
-			params:dict = inspect.signature(task_func).parameters
-			for opt, opt_def in TASK_OPTIONS:
-				param = params.get(opt)
-				if param is None:
-					task[opt] = opt_def
-				else:
-					task[opt] = param.default
+			task:dict = self.task_options(task_func, options_cache)
 			if not task['task']: continue
 			if not task['active']: continue
-			task['_params'] = tuple(p.lower() for p in params.keys())
+			task['_stats'] = {}
+			task['_cache'] = {}
+			if task['debounce'] or task['throttle']: self._burst_init(task)
 			self.task_dict[task_func_name] = task
 			task['task_func'] = task_func
 			task['task_func_name'] = task_func_name
@@ -380,9 +452,155 @@ class Tasks:
 			else:
 				task['task_name'] = func_name_human(task_func_name)
 				task['task_name_full'] = task['task_name']
+		cache.task_options = options_cache
+
+	@staticmethod
+	def task_options(task_func:Callable, options_cache:dict|None=None)->dict:
+		r'''
+		Returns a new dictionary with the task options: `TASK_OPTIONS`
+		defaults updated with the function defaults.  
+		The result is cached by the code object and defaults of
+		the function in `cache.task_options`, so on a crontab
+		reload only new and changed functions are inspected.
+		The defaults are also compared by *repr*, as `1`, `1.0`
+		and `True` are equal but are different options.  
+		*options_cache* - a dictionary to collect the used
+		entries, `Tasks` replaces the cache with it so stale
+		entries do not pile up.  
+		A crontab of 1000 tasks, the first load and a reload:
+
+			src = '\n'.join(
+				f'def task_{i}(every="{i} sec", log=False, single=True): pass'
+				for i in range(1000)
+			)
+			exec(src, ns := {})
+			funcs = tuple(v for k, v in ns.items() if k.startswith('task_'))
+			load = lambda: tuple(map(Tasks.task_options, funcs))
+			cache.task_options.clear()
+			asrt( bmark(load, b_iter=1), 75_000_000 )
+			asrt( bmark(load), 4_000_000 )
+
+		'''
+		try:
+			key = (
+				task_func.__code__
+				, task_func.__defaults__
+				, task_func.__kwdefaults__
+				, repr(task_func.__defaults__)
+				, repr(task_func.__kwdefaults__)
+			)
+			if hasattr(task_func, '__wrapped__'): raise TypeError
+			options = cache.task_options.get(key)
+		except TypeError:
+			key = options = None
+		if options is None:
+			options = {}
+			params:dict = inspect.signature(task_func).parameters
+			for opt, opt_def in TASK_OPTIONS:
+				param = params.get(opt)
+				if param is None:
+					options[opt] = opt_def
+				else:
+					options[opt] = param.default
+			options['_async'] = inspect.iscoroutinefunction(task_func)
+			options['_sig'] = Tasks._task_sig(options, task_func)
+			options['_params'] = tuple(p.lower() for p in params.keys())
+			if key: cache.task_options[key] = options
+		if key and options_cache is not None: options_cache[key] = options
+		return options.copy()
 	
-	def start_listeners(self):
+	@staticmethod
+	def _task_sig(task:dict, task_func:Callable)->tuple:
+		' Options and code of the task to find out what a reload has changed '
+		code = task_func.__code__
+		return (
+			repr(tuple(task.values()))
+			, code.co_code
+			, code.co_names
+			, repr(tuple(
+				c for c in code.co_consts if not isinstance(c, types.CodeType)
+			))
+		)
+
+	@staticmethod
+	def _listener_keys(task:dict)->dict:
+		r'''
+		Keys of the task listeners by listener kind.  
+		A key includes all the options the listener depends on,
+		so a listener with the same key can be kept on a reload.  
+		'''
+		name = task['task_func_name']
+		keys = {}
+		if task['schedule']:
+			keys['schedule'] = ('schedule', name, repr(task['schedule']))
+		if task['every']:
+			keys['every'] = ('every', name, repr(task['every']))
+		burst = bool(task['_burst'])
+		if task['on_file_change']:
+			keys['file'] = ('file', name, task['on_file_change']
+			, task['on_file_change_flags'], burst)
+		if task['on_dir_change']:
+			keys['dir'] = ('dir', name, task['on_dir_change']
+			, task['on_dir_change_flags'], burst)
+		if task['event_log']:
+			keys['event'] = ('event', name, task['event_log']
+			, task['event_xpath'])
+		return keys
+
+	def _hotkeys_sig(self)->tuple:
+		return tuple(sorted(
+			(t['hotkey'], n) for n, t in self.task_dict.items() if t['hotkey']
+		))
+
+	def adopt(self, prev:'Tasks')->bool:
+		r'''
+		Takes the listeners of unchanged tasks from the previous
+		instance and closes the rest of it.  
+		Scheduler jobs, directory watchers and event subscriptions
+		are kept if their options are the same. Global hotkeys and
+		the keyboard hook are kept if the hotkeys are the same.  
+		The HTTP server is kept if there are still HTTP tasks, so
+		open connections are not dropped.  
+		Returns True if the global hotkeys were kept.  
+		'''
+		for task in self.task_dict.values():
+			for key in self._listener_keys(task).values():
+				if (stop := prev.listeners.pop(key, None)) is None: continue
+				self.listeners[key] = stop
+		hk_adopted = False
+		if prev.global_hk and prev._hotkeys_sig() == self._hotkeys_sig():
+			self.global_hk, prev.global_hk = prev.global_hk, None
+			hk_adopted = True
+		if prev.hook_kb and any(t['hotkey_nb'] for t in self.task_dict.values()):
+			self.hook_kb, prev.hook_kb = prev.hook_kb, None
+		if prev.http_server and any(
+			t['http'] != False for t in self.task_dict.values()
+		):
+			self.http_server, prev.http_server = prev.http_server, None
+		if is_dev():
+			changed = added = 0
+			for name, task in self.task_dict.items():
+				if not (prev_task := prev.task_dict.get(name)):
+					added += 1
+				elif prev_task['_sig'] != task['_sig']:
+					changed += 1
+			removed = len(prev.task_dict.keys() - self.task_dict.keys())
+			ttprint(
+				f'tasks: {changed} changed, {added} added, {removed} removed'
+				+ f', listeners kept: {len(self.listeners)}'
+				+ f', stopped: {len(prev.listeners)}'
+			)
+		prev.close()
+		return hk_adopted
+
+	def start_listeners(self, prev:'Tasks|None'=None):
+		r'''
+		Starts the task listeners.  
+		*prev* - the previous instance on a crontab reload,
+		see `adopt`.  
+		'''
 		if app.is_cmd_task: return
+		hk_adopted = self.adopt(prev) if prev else False
 		for task in self.task_dict.values():
 			if task['startup']:
 				self.task_list_startup.append(task)
@@ -400,7 +618,7 @@ class Tasks:
 				self.add_dir_change_watch(task, is_file=False
 				, path=task['on_dir_change'])
 			if task['event_log']: self.add_event_handler(task)
-			if task['left_click']:
+			if task['left_click'] and not HEADLESS:
 				self.task_list_left_click.append(task)
 				app.taskbaricon.Bind(
 					wx.adv.EVT_TASKBAR_LEFT_DOWN
@@ -409,7 +627,7 @@ class Tasks:
 				)
 			if task['every']: self.add_every(task)
 			if task['date']: self.add_schedule_date(task)
-			if task['hotkey']: self.add_hotkey(task)
+			if task['hotkey'] and not hk_adopted: self.add_hotkey(task)
 			if task['hotkey_nb']: self.add_hotkey_nb(task)
 			if task['menu']:
 				submenu = None
@@ -476,18 +694,19 @@ class Tasks:
 					))
 				)
 			)
-		elif left_click_tasks_count == 0:
+		elif left_click_tasks_count == 0 and not HEADLESS:
 			app.taskbaricon.Bind(
 				wx.adv.EVT_TASKBAR_LEFT_DOWN
 				, app.taskbaricon.on_left_down
 			)
-		if self.global_hk:
+		if self.global_hk and not hk_adopted:
 			thread_start(self.global_hk.listen
 			, err_msg=True, ident='app: global hotkey listener')
-		if self.task_list_http:
+		self.http_routes = HTTPRoutes(self.task_list_http)
+		if self.task_list_http and not self.http_server:
 			thread_start(http_server_start, err_msg=True
 			, ident='app: http server')
-		if self.hotkeys_nb:
+		if self.hotkeys_nb and not self.hook_kb:
 			thread_start(
 				msg_listener
 				, args=(self,)
@@ -504,7 +723,7 @@ class Tasks:
 		try:
 			self.global_hk.register(
 				task['hotkey']
-				, func=self.run_task
+				, func=task_run
 				, func_args=(task['task_func_name'], CALLER_HOTKEY)
 			)
 		except Exception as err:
@@ -546,6 +765,8 @@ class Tasks:
 
 	def add_dir_change_watch(self, task:dict, path:str, is_file:bool):
 		' Watch for changes in directory '
+		key = self._listener_keys(task)['file' if is_file else 'dir']
+		if key in self.listeners: return
 		WAIT_SEC = .1
 		FILE_LIST_DIRECTORY = 0x0001
 		BUFFER_SIZE = 65536
@@ -575,15 +796,15 @@ class Tasks:
 			dir_path:str = file_dir(path) if is_file else path
 			fname = file_name(path)
 			prev_file = ('', time.time())
+			burst = bool(task['_burst'])
 			if is_file:
 				flags = task['on_file_change_flags']
 			else:
 				flags = task['on_dir_change_flags']
-			tasks_ver = tasks.version
 			while True:
 				status:bool = False
 				while not status:
-					if tasks_ver != tasks.version:
+					if not watch['alive']:
 						return
 					status, data = get_dir_handle(dir_path)
 					if status: break
@@ -594,19 +815,16 @@ class Tasks:
 						pass
 					time.sleep(RECONNECT_TIMEOUT)
 				hDir = data
-				self.dir_change_stop[hDir] = dir_path
+				watch['handles'][hDir] = dir_path
 				while True:
 					if hDir.handle == 0:
 						if is_dev():
 							ttprint('the handle was closed ' + dir_path)
 							tlog('the handle was closed ' + dir_path)
 						return
-					if tasks_ver != tasks.version:
+					if not watch['alive']:
 						if is_dev():
-							msg = (
-								task['task_func_name']
-								+ f' stop RDC {tasks_ver} != {tasks.version}'
-							)
+							msg = task['task_func_name'] + ' stop RDC'
 							ttprint(msg)
 							tlog(msg)
 						return
@@ -623,7 +841,7 @@ class Tasks:
 						if errp.winerror == 995:
 							return
 						elif errp.winerror in (6, 53, 64):
-							self.dir_change_stop.pop(hDir, None)
+							watch['handles'].pop(hDir, None)
 							try:
 								hDir.Close()
 							except Exception as err_cl:
@@ -639,7 +857,7 @@ class Tasks:
 						if is_dev():
 							con_log(f'RDC general error: {errg}', tname='app')
 						raise errg
-					if prev_file[0]:
+					if prev_file[0] and not burst:
 						pfile, ptime = prev_file
 						try:
 							cfile, ctime = results[-1][1], time.time()
@@ -651,7 +869,7 @@ class Tasks:
 							prev_file = (cfile, ctime)
 							continue
 					prev_file = (results[-1][1], time.time())
-					for res_action, res_relname in results[:1]:
+					for res_action, res_relname in (results if burst else results[:1]):
 						if is_file and (
 							res_relname != fname
 							or res_action != 3
@@ -663,12 +881,19 @@ class Tasks:
 							fullpath = path
 						else:
 							fullpath = os.path.join(path, res_relname)
-						self.run_task(
-							task_func_name=task['task_func_name']
+						task_run(
+							task['task_func_name']
 							, caller=caller
 							, data=(fullpath, action)
 						)
-					
+
+		def stop():
+			watch['alive'] = False
+			for hDir, dir_path in tuple(watch['handles'].items()):
+				self._dir_handle_close(hDir, dir_path)
+
+		watch = {'alive': True, 'handles': {}}
+		self.listeners[key] = stop
 		thread_start(
 			dir_watch
 			, kwargs={
@@ -681,6 +906,9 @@ class Tasks:
 		)
 
 	def add_every(self, task:dict):
+		key = self._listener_keys(task)['every']
+		if key in self.listeners: return
+		self.listeners[key] = lambda: schedule.clear(key)
 
 		def exc_rep(e):
 			msg_warn(
@@ -699,10 +927,10 @@ class Tasks:
 				try:
 					sched = schedule.every( int(ev_items[0]) )
 					getattr(sched, sched_unit).do(
-						self.run_task
+						task_run
 						, task_func_name=task['task_func_name']
 						, caller=CALLER_SCHEDULER
-					)
+					).tag(key)
 				except Exception as e:
 					exc_rep(e)
 			elif ev_type == 'time_int_rnd':
@@ -712,10 +940,10 @@ class Tasks:
 						int(ev_items[0])
 					).to( int(ev_items[2]) )
 					getattr(sched, sched_unit).do(
-						self.run_task
+						task_run
 						, task_func_name=task['task_func_name']
 						, caller=CALLER_SCHEDULER
-					)
+					).tag(key)
 				except Exception as e:
 					exc_rep(e)
 			elif ev_type == 'day':
@@ -723,10 +951,10 @@ class Tasks:
 				try:
 					sched = schedule.every()
 					getattr(sched, sched_unit).at(ev_items[1]).do(
-						self.run_task
+						task_run
 						, task_func_name=task['task_func_name']
 						, caller=CALLER_SCHEDULER
-					)
+					).tag(key)
 				except Exception as e:
 					exc_rep(e)
 			elif ev_type == 'time_day':
@@ -734,10 +962,10 @@ class Tasks:
 				try:
 					sched = schedule.every()
 					getattr(sched, sched_unit).at(ev_items[1]).do(
-						self.run_task
+						task_run
 						, task_func_name=task['task_func_name']
 						, caller=CALLER_SCHEDULER
-					)
+					).tag(key)
 				except Exception as e:
 					exc_rep(e)
 			else:
@@ -747,16 +975,20 @@ class Tasks:
 		r'''
 		*task* - dictionary with task parameters.  
 		'''
+		key = self._listener_keys(task)['schedule']
+		if key in self.listeners: return
+		self.listeners[key] = lambda: schedule.clear(key)
 		intervals = task['schedule']
 		if isinstance(intervals, str): intervals = (intervals,)
 		for inter in intervals:
 			try:
 				sched_rule = (
 					'schedule.' + inter
-					+ f".do(self.run_task, task_func_name=task['task_func_name']"
+					+ f".do(task_run, task_func_name=task['task_func_name']"
 					+ f', caller="{CALLER_SCHEDULER}")'
 				)
-				eval(sched_rule)
+				job = eval(sched_rule)
+				if isinstance(job, schedule.Job): job.tag(key)
 			except Exception as e:
 				msg_warn(
 					lang.warn_schedule.format(task['task_name_full'])
@@ -764,34 +996,51 @@ class Tasks:
 				)
 
 	def add_schedule_date(self, task):
-		''' task - dict with task options '''
+		r'''
+		*task* - dict with task options.  
+		The next matching minute is calculated with `date_next`
+		and put in the scheduler timers, so there is no job
+		between runs.  
+		'''
 		
-		def run_task_date(date_dic:dict, task:dict):
-			dt_now = datetime.datetime.now().replace(second=0, microsecond=0)
-			if dt_now != date_fill(date_dic):
-				return
+		def arm(date_dic:dict, after:dtime)->bool:
+			if not (next_dt := date_next(date_dic, after)): return False
+			self.timer_add(next_dt.timestamp(), run_task_date
+			, (date_dic, next_dt))
+			return True
+
+		def run_task_date(date_dic:dict, due:dtime):
 			self.run_task(task_func_name=task['task_func_name']
 			, caller=CALLER_SCHEDULER)
+			arm(date_dic, max(
+				due + tdelta(minutes=1)
+				, dtime.now().replace(second=0, microsecond=0)
+			))
+
 		DATE_PARTS = ('year', 'month', 'day', 'hour', 'minute')
 		dates = task['date']
 		if isinstance(dates, str): dates = [dates]
+		after = dtime.now().replace(second=0, microsecond=0) \
+		+ tdelta(minutes=1)
 		for date in dates:
-			if not (matches := self.REGEX_DATE.findall(date)):
-				msg_warn(
-					lang.warn_date_format.format(
-						task['task_name_full']
-						, date
-					)
+			if (matches := self.REGEX_DATE.findall(date)):
+				dt_dic = {}
+				for num, part in enumerate(matches[0]):
+					dt_dic[ DATE_PARTS[num] ] = None if part == '*' else int(part)
+				try:
+					arm(dt_dic, after)
+					continue
+				except ValueError:
+					pass
+			msg_warn(
+				lang.warn_date_format.format(
+					task['task_name_full']
+					, date
 				)
-				continue
-			dt_dic = {}
-			for num, part in enumerate(matches[0]):
-				dt_dic[ DATE_PARTS[num] ] = None if part == '*' else int(part)
-			schedule.every().minute.do(
-				run_task_date, date_dic=dt_dic, task=task)
+			)
 
 	def run_at_startup(self):
-		if sett.hide_console:
+		if sett.hide_console and app.app_hwnd:
 			win32gui.ShowWindow(app.app_hwnd, win32con.SW_HIDE)
 		for task in self.task_list_startup:
 			self.run_task(task['task_func_name'], caller=CALLER_STARTUP)
@@ -806,7 +1055,8 @@ class Tasks:
 			self.run_task(task['task_func_name'], caller=CALLER_LOAD)
 
 	def run_task(self, task_func_name:str, caller:str=None, data=None
-	, result:list=None, wait_event:threading.Event=None):
+	, result:list=None, wait_event:threading.Event=None
+	, coalesced:bool=False):
 		r'''
 		Logging, threading, error catching and other stuff.
 		*task* - dict with task options
@@ -819,32 +1069,53 @@ class Tasks:
 			passed through all inner fuctions (`run_task_inner` and
 			`catcher`).
 		*wait_event* - for signaling somewhere that the task has finished  
+		*coalesced* - the *data* is a list collected by the *debounce*
+			or *throttle* option, see `burst_add`.  
+		Daemon runs are executed by the `app.task_pools` workers
+		, the *max_concurrency* option limits the number of
+		simultaneous runs of the task in all lanes together
+		(the lanes share `TPoolLimits`), the rest wait in line.  
+		The pool (lane) is chosen by the *priority* option, without
+		it the runs from a hotkey, menu and left click go to the
+		interactive lane, so they do not wait behind the background
+		work and get a higher thread priority.  
 		'''
 
 		def run_task_inner(result:list=None):
 
-			def catcher(task:dict, result_storage:list|None=None):
-
-				def get_task():
-					' Get current task dictionary '
-					try:
-						return tasks.task_dict.get(task_func_name)
-					except:
-						if is_dev():
-							msg = f'exception after execution: {exc_text()}'
-							ttprint(msg)
-							msg_warn(msg)
-						return None
-				cur_task = task
-				start_time = dtime.now()
-				app.app_threads[thread.native_id] = {
-					'func': 'task: ' + task_func_name
-					, 'stime': start_time
-					, 'thread': thread
-					, 'task_func_name': task_func_name
-				}
+			def get_task():
+				' Get current task dictionary '
+				try:
+					return tasks.task_dict.get(task_func_name)
+				except:
+					if is_dev():
+						msg = f'exception after execution: {exc_text()}'
+						ttprint(msg)
+						msg_warn(msg)
+					return None
+
+			def task_begin(cur_task:dict, start_time:dtime
+			, result_storage:list|None
+			)->tuple[dict, CancelToken, TraceSpan]:
+				r'''
+				Marks the task as running, returns its kwargs,
+				the cancel token and the trace span. The *timeout*
+				cancels the token when the result is awaited or
+				the task is isolated.  
+				'''
+				span = TraceSpan('task: ' + task_func_name, caller=caller
+				, parent=parent_span, wait=time.perf_counter() - queued)
+				token = CancelToken()
+				isolated = cur_task['process'] or cur_task['isolate']
+				if (
+					(result_storage is not None or cur_task['isolate'])
+					and (timeout := value_to_unit(cur_task['timeout'], 'sec'))
+				):
+					token.timer = self.timer_add(time.time() + timeout
+					, token.cancel, ('timeout',))
+				cur_task['_cancel'] = token
 				cur_task['running'] = True
-				cur_task['_tid'] = thread.native_id
+				cur_task['_tid'] = threading.current_thread().native_id
 				cur_task['_call_count'] += 1
 				cur_task['_caller'] = caller
 				task_kwargs = {}
@@ -852,17 +1123,27 @@ class Tasks:
 					task_kwargs['caller'] = caller
 				if 'data' in cur_task['_params']:
 					task_kwargs['data'] = data
+				if 'cancel' in cur_task['_params'] and not isolated:
+					task_kwargs['cancel'] = token
 				cur_task['last_start'] = start_time
-				try:
-					task_result = cur_task['task_func'](**task_kwargs)
-				except Exception:
-					exc_str = exc_text()
+				return task_kwargs, token, span
+
+			def task_end(cur_task:dict, result_storage:list|None
+			, token:CancelToken, span:TraceSpan, run_start:float
+			, exc_str:str|None, task_result=None):
+				' Stores the result, counts errors and stats '
+				if token.timer: self.timer_cancel(token.timer)
+				if exc_str is not None:
+					span.end('error')
+				else:
+					span.end('cancelled' if task_result is _TASK_ERROR else 'ok')
+				if exc_str is not None:
 					new_task = get_task()
 					if new_task:
 						new_task['running'] = False
 						err_counter = new_task['err_counter'] + 1
 						if result_storage is not None:
-							result_storage.append('<task error>')
+							result_storage.append(_TASK_ERROR)
 						new_task['_last_err'] = exc_str
 						if err_counter <= new_task['err_threshold']:
 							new_task['err_counter'] = err_counter
@@ -888,8 +1169,70 @@ class Tasks:
 						if is_dev():
 							msg_err('task not found after execution (s): '
 							+ task_func_name)
+				self.stats_add(new_task or cur_task, caller
+				, wait=run_start - queued, run=time.perf_counter() - run_start)
 				if wait_event: wait_event.set()
+
+			def catcher(task:dict, result_storage:list|None=None):
+				start_time = dtime.now()
+				thread = threading.current_thread()
+				app.app_threads.setdefault(thread.native_id, {}).update({
+					'func': 'task: ' + task_func_name
+					, 'stime': start_time
+					, 'thread': thread
+					, 'task_func_name': task_func_name
+				})
+				ctx_token = cache.task_ctx.set((task_func_name, caller))
+				task_kwargs, token, span = task_begin(task, start_time
+				, result_storage)
+				run_start = time.perf_counter()
+				try:
+					if task['process'] or task['isolate']:
+						future = app.proc_pool.submit(task['task_func']
+						, kwargs=task_kwargs)
+						if task['isolate']:
+							token.on_cancel(lambda: (
+								app.proc_pool.kill(future) or future.cancel()
+							))
+						task_result = future.result()
+					else:
+						task_result = task['task_func'](**task_kwargs)
+				except Exception as exc:
+					if token.is_cancel(exc):
+						dev_print(f'task cancelled ({token.reason}): {task_func_name}')
+						task_end(task, result_storage, token, span, run_start
+						, None, _TASK_ERROR)
+					else:
+						task_end(task, result_storage, token, span, run_start
+						, exc_text())
+				else:
+					task_end(task, result_storage, token, span, run_start, None, task_result)
 				_thread_pop('task', tid=thread.native_id)
+				cache.task_ctx.reset(ctx_token)
+
+			async def acatcher(task:dict, result_storage:list|None=None):
+				r'''
+				`catcher` for the `async def` tasks, runs on the
+				app event loop. The cancel token cancels the
+				asyncio task.  
+				'''
+				cache.task_ctx.set((task_func_name, caller))
+				task_kwargs, token, span = task_begin(task, dtime.now()
+				, result_storage)
+				run_start = time.perf_counter()
+				atask = asyncio.current_task()
+				loop = asyncio.get_running_loop()
+				token.on_cancel(lambda: loop.call_soon_threadsafe(atask.cancel))
+				try:
+					task_result = await task['task_func'](**task_kwargs)
+				except (TaskCancelled, asyncio.CancelledError):
+					dev_print(f'task cancelled ({token.reason}): {task_func_name}')
+					task_end(task, result_storage, token, span, run_start, None, _TASK_ERROR)
+				except Exception:
+					task_end(task, result_storage, token, span, run_start, exc_text())
+				else:
+					task_end(task, result_storage, token, span, run_start, None, task_result)
+
 			if task['rule'] and (caller != tcon.CALLER_MENU):
 				for rule in task['rule']:
 					try:
@@ -901,15 +1244,36 @@ class Tasks:
 			if task['log'] and caller != CALLER_CMDLINE:
 				cs = f' ({caller})' if caller else ''
 				con_log(f'task{cs}: {task["task_name_full"]}', tname='')
-			if task['result']:
-				args = (task, result)
-			else:
-				args = (task, result)
+			if task['_async']:
+				task['running'] = True
+				future = async_run(acatcher(task, result))
+				if not daemon: future.result()
+				return
+			lane = task['priority'] or (
+				tcon.PRIORITY_INTERACTIVE if caller in tcon.CALLERS_INTERACTIVE
+				else tcon.PRIORITY_NORMAL
+			)
+			if daemon and not (task['result'] and result is None):
+				task['running'] = True
+				app.task_pools.get(lane, app.task_pool).submit(
+					catcher
+					, args=(task, result)
+					, key=task_func_name
+					, limit=task['max_concurrency']
+					, ident='task: ' + task_func_name
+				)
+				return
 			thread = threading.Thread(target=catcher, daemon=daemon
-			, name=task['task_name'], args=args )
+			, name=task['task_name'], args=(task, result) )
 			thread.start()
+			priority = tcon.TASK_PRIORITY.get(lane
+			, win32con.THREAD_PRIORITY_NORMAL)
+			if priority != win32con.THREAD_PRIORITY_NORMAL:
+				thread_priority_set(thread.native_id, priority=priority)
 			if task['result']: thread.join()
 		if app.is_cmd_task and (caller != CALLER_CMDLINE): return
+		queued = time.perf_counter()
+		parent_span = trace_span_id()
 		task:dict = self.task_dict.get(task_func_name)
 		if task is None:
 			ttprint(f'task not found: {task_func_name}')
@@ -919,16 +1283,194 @@ class Tasks:
 			and ( not task['hyperactive'])
 			and caller != CALLER_MENU
 		): return
+		if (
+			task['_burst']
+			and (not coalesced)
+			and result is None
+			and not caller in (CALLER_MENU, CALLER_CMDLINE, CALLER_EXIT)
+		):
+			self.burst_add(task, caller, data)
+			return
+		if task['cache_ttl'] and result is not None:
+			if not (run_args := self.result_cache(task, data, result, wait_event)):
+				return
+			result, wait_event = run_args
 		if task['single']:
 			if task['running']:
 				return
 		daemon = (not caller in (CALLER_EXIT, CALLER_CMDLINE)) 
 		if task['result'] and not (result is None):
-			thread_start(run_task_inner, is_daemon=daemon, args=(result,)
-			, err_msg=True, ident='app: run_task_inner: ' + task['task_name'])
+			if daemon:
+				run_task_inner(result)
+			else:
+				thread_start(run_task_inner, is_daemon=daemon, args=(result,)
+				, err_msg=True, ident='app: run_task_inner: ' + task['task_name'])
 		else:
 			run_task_inner()
 
+	@staticmethod
+	def _burst_init(task:dict):
+		r'''
+		Parses the *debounce* and *throttle* options of the task.  
+		*throttle* - a string like '1/5 sec' or a tuple like (1, '5 sec'):
+		the number of runs per period.  
+		'''
+		try:
+			debounce = throttle = None
+			if task['debounce']:
+				debounce = value_to_unit(task['debounce'], 'sec')
+			if task['throttle']:
+				if isinstance(task['throttle'], str):
+					limit, period = task['throttle'].split('/')
+				else:
+					limit, period = task['throttle']
+				if isinstance(period, str) and not any(map(str.isdigit, period)):
+					period = '1 ' + period.strip()
+				throttle = (int(limit), value_to_unit(period, 'sec'))
+		except Exception:
+			msg_warn(lang.warn_burst.format(task['task_name_full']
+			, task['debounce'] or task['throttle']))
+			return
+		task['_burst'] = {
+			'debounce': debounce
+			, 'throttle': throttle
+			, 'events': []
+			, 'caller': None
+			, 'due': 0.0
+			, 'armed': False
+			, 'runs': []
+		}
+
+	def burst_add(self, task:dict, caller:str|None, data):
+		r'''
+		Collects a trigger of the task with the *debounce*
+		or *throttle* option and arms a timer for one run
+		with all the collected data.  
+		With *debounce* the run starts when there were no new
+		triggers for the debounce time. With *throttle* the runs
+		are started no more often than allowed.  
+		'''
+		burst = task['_burst']
+		with self._burst_lock:
+			burst['events'].append(data)
+			burst['caller'] = caller
+			burst['due'] = time.time() + (burst['debounce'] or 0)
+			if burst['armed']: return
+			burst['armed'] = True
+		self.timer_add(burst['due'], self.burst_flush, (task,))
+
+	def burst_flush(self, task:dict):
+		r'''
+		Timer of `burst_add`: runs the task with the list of the
+		collected data or arms the timer again if it is too early.  
+		'''
+		BUSY_RETRY = 0.1
+		burst = task['_burst']
+		now = time.time()
+		with self._burst_lock:
+			due = burst['due']
+			if throttle := burst['throttle']:
+				limit, period = throttle
+				runs = burst['runs']
+				while runs and runs[0] <= now - period: runs.pop(0)
+				if len(runs) >= limit: due = max(due, runs[0] + period)
+			if task['single'] and task['running']:
+				due = max(due, now + BUSY_RETRY)
+			if due <= now:
+				events, burst['events'] = burst['events'], []
+				caller = burst['caller']
+				burst['armed'] = False
+				if throttle: burst['runs'].append(now)
+		if due > now:
+			self.timer_add(due, self.burst_flush, (task,))
+			return
+		self.run_task(task['task_func_name'], caller=caller, data=events
+		, coalesced=True)
+
+	def result_cache(self, task:dict, data, result:list
+	, wait_event:threading.Event|None)->tuple|None:
+		r'''
+		Serves a run of a task with the *cache_ttl* option.  
+		Returns None if the result is taken from the cache or
+		the run joined a run in progress with the same key,
+		otherwise returns a new (result, wait_event) for the run
+		, so its result will be cached and shared.  
+		The key is the path and parameters of an HTTP request.
+		POST requests and other data are not cached.  
+		A *single* task that is already running (with another key
+		or not from HTTP) does not get a new entry: the run
+		bounces off in `run_task` as without the cache.  
+		'''
+		if data is None:
+			key = ()
+		elif isinstance(data, DataHTTPReq) and data.method != 'POST':
+			key = (data.path, *sorted(data.params.items()))
+		else:
+			return result, wait_event
+		now = time.monotonic()
+		cache = task['_cache']
+		with self._cache_lock:
+			entry = cache.get(key)
+			if entry and entry['done'] and entry['expires'] > now:
+				task['_cache_hits'] += 1
+				value = entry['value']
+			elif entry and (not entry['done']) and (
+				now - entry['started'] < value_to_unit(task['timeout'], 'sec')
+			):
+				task['_cache_hits'] += 1
+				entry['waiters'].append((result, wait_event))
+				return None
+			elif task['single'] and task['running']:
+				return result, wait_event
+			else:
+				task['_cache_misses'] += 1
+				if len(cache) >= _CACHE_MAX:
+					for k in tuple(cache):
+						if cache[k]['done'] and cache[k]['expires'] <= now:
+							del cache[k]
+					if len(cache) >= _CACHE_MAX: del cache[next(iter(cache))]
+				entry = cache[key] = {
+					'done': False
+					, 'value': None
+					, 'expires': 0.0
+					, 'started': now
+					, 'waiters': [(result, wait_event)]
+				}
+				flight = _CacheFlight(entry
+				, value_to_unit(task['cache_ttl'], 'sec'), self._cache_lock)
+				return flight.result, flight
+		result.append(value)
+		if wait_event: wait_event.set()
+		return None
+
+	@staticmethod
+	def stats_add(task:dict, caller:str|None, wait:float, run:float):
+		r'''
+		Adds the queue wait and run duration (in seconds)
+		to the task histograms of the *caller*.  
+		'''
+		if not (stats := task['_stats'].get(caller)):
+			stats = task['_stats'].setdefault(caller
+			, {'wait': Histogram(), 'run': Histogram()})
+		stats['wait'].add(wait)
+		stats['run'].add(run)
+
+	def stats_summary(self)->dict:
+		r'''
+		Returns the queue wait and run duration summaries for every
+		task and caller: `{task: {caller: {'wait': {...}, 'run': {...}}}}`  
+		'''
+		summary = {}
+		for func_name, task in self.task_dict.items():
+			if not task['_stats']: continue
+			summary[func_name] = {
+				str(caller): {
+					'wait': hists['wait'].summary()
+					, 'run': hists['run'].summary()
+				} for caller, hists in tuple(task['_stats'].items())
+			}
+		return summary
+
 	def add_idle_task(self, task):
 		dur = value_to_unit(task['idle'], 'ms')
 		task['idle_dur'] = int(dur)
@@ -936,6 +1478,8 @@ class Tasks:
 		self.task_list_idle.append(task)
 	
 	def add_event_handler(self, task):
+		key = self._listener_keys(task)['event']
+		if key in self.listeners: return
 		
 		def event_handler(evt_handle):
 			r'''
@@ -974,7 +1518,7 @@ class Tasks:
 						)
 					except:
 						msg = '<message exception>'
-			self.run_task(task['task_func_name'], caller=CALLER_EVENT
+			task_run(task['task_func_name'], caller=CALLER_EVENT
 			, data=DataEvent(event, msg, evt_data))
 			context_sys.close()
 			context_data.close()
@@ -1010,48 +1554,176 @@ class Tasks:
 			) )
 			win32event.SetEvent(signal)
 			return
-		self.event_handlers.append((sub, signal))
+
+		def stop():
+			win32event.SetEvent(signal)
+			sub.close()
+
+		self.listeners[key] = stop
 		thread_start(
 			event_wait
 			, ident=f'app: event_wait ({task["task_func_name"]})'
 		)
 
+	def timer_add(self, when:float, func:Callable, args:tuple=())->int:
+		r'''
+		Runs *func* in the scheduler thread at *when* (timestamp
+		as in `time.time()`). The function should be quick, so
+		usually it just calls `run_task`.  
+		Returns the timer id for `timer_cancel`.  
+		'''
+		with self._timers_lock:
+			self._timer_seq += 1
+			seq = self._timer_seq
+			heapq.heappush(self._timers, (when, seq, func, args))
+			is_first = self._timers[0][1] == seq
+		if is_first: self._sched_wake.set()
+		return seq
+
+	def timer_cancel(self, seq:int):
+		r'''
+		Cancels the timer. The entry is skipped when it is due
+		, the heap is rebuilt when more than half of it
+		is cancelled.  
+		'''
+		with self._timers_lock:
+			self._timers_cancelled.add(seq)
+			if len(self._timers_cancelled) * 2 > len(self._timers):
+				self._timers = [
+					t for t in self._timers
+					if not t[1] in self._timers_cancelled
+				]
+				heapq.heapify(self._timers)
+				self._timers_cancelled.clear()
+
+	def scheduler_wake(self):
+		r'''
+		Makes the scheduler recalculate the time of the next job,
+		e.g. after adding a job with `schedule` from a task.  
+		'''
+		self._sched_check = True
+		self._sched_wake.set()
+
+	def _timers_run(self)->float|None:
+		r'''
+		Runs due timers and returns the time of the next one.  
+		'''
+		while True:
+			with self._timers_lock:
+				if not self._timers: return None
+				if self._timers[0][0] > time.time(): return self._timers[0][0]
+				_, seq, func, args = heapq.heappop(self._timers)
+				if seq in self._timers_cancelled:
+					self._timers_cancelled.discard(seq)
+					continue
+			try:
+				func(*args)
+			except:
+				dev_print('timer exception:' + str_indent(exc_text(3)))
+
+	def _idle_check(self)->float:
+		r'''
+		Starts *idle* tasks and returns the number of seconds
+		until the next check.  
+		If there was an input since the previous check then the
+		user is back and all idle tasks can run again.  
+		'''
+		msec = _idle_millis()
+		now = time.monotonic()
+		if msec < (now - self._idle_prev) * 1000:
+			for task in self.task_list_idle: task['idle_done'] = False
+		self._idle_prev = now
+		wait = None
+		for task in self.task_list_idle:
+			if task['idle_done']:
+				wait = min(wait or self.idle_min, self.idle_min)
+				continue
+			if msec >= task['idle_dur']:
+				self.run_task(task['task_func_name'], caller=CALLER_IDLE)
+				task['idle_done'] = True
+				wait = min(wait or self.idle_min, self.idle_min)
+			else:
+				left = task['idle_dur'] - msec
+				wait = left if wait is None else min(wait, left)
+		return wait / 1000
+
 	def run_scheduler(self):
+		r'''
+		Runs *schedule* jobs, timers (*date* tasks and so on) and
+		*idle* tasks. Instead of polling every second the thread
+		sleeps until the nearest job and is woken up by `timer_add`
+		, `scheduler_wake` or `close`.  
+		The sleep is limited to *MAX_SLEEP* to survive system clock
+		changes and jobs added directly with `schedule`.
+		The last *SPIN* seconds are slept with `time.sleep` since it
+		is more precise than the event timeout.  
+		The *schedule* jobs are scanned only when the nearest one is
+		due, after `scheduler_wake` or *MAX_SLEEP*, so the wake-ups
+		for timers do not go through thousands of jobs. Due timers
+		run first.  
+
+		Drift check with 5000 jobs from the command prompt:
+
+			for _ in range(5_000):
+				schedule.every(1).hours.do(lambda: None)
+			tasks.scheduler_wake()
+			drift = []
+			for i in range(20):
+				when = time.time() + 0.5 + i * 0.1
+				tasks.timer_add(when, lambda w=when: drift.append(time.time() - w))
+			cpu = time.process_time()
+			time_sleep('30 sec')
+			asrt( max(drift) < 0.01, True )
+			asrt( time.process_time() - cpu < 0.05, True )
+			schedule.clear()
+
+		'''
+		MAX_SLEEP = 60.0
+		SPIN = 0.02
 		tasks_ver = tasks.version
-		afk = True
 		if self.task_list_idle:
-			afk = False
 			self.idle_min = min((t['idle_dur'] for t in self.task_list_idle))
-		while (tasks_ver == tasks.version):
-			schedule.run_pending()
+			self._idle_prev = time.monotonic()
+		idle_next = 0.0
+		sched_next = 0.0
+		while self._is_alive and (tasks_ver == tasks.version):
+			self._sched_wake.clear()
+			timer_next = self._timers_run()
+			if self._sched_check or time.time() >= sched_next:
+				self._sched_check = False
+				schedule.run_pending()
+				sched_sec = schedule.idle_seconds()
+				sched_next = time.time() + (
+					MAX_SLEEP if sched_sec is None else min(sched_sec, MAX_SLEEP)
+				)
+			now = time.time()
+			delay = sched_next - now
+			if timer_next is not None:
+				delay = min(delay, timer_next - now)
 			if self.task_list_idle:
-				msec = _idle_millis()
-				if msec < self.idle_min:
-					if afk:
-						afk = False
-						for task in self.task_list_idle:
-							task['idle_done'] = False
-				else:
-					afk = True
-					for task in self.task_list_idle:
-						if task['idle_done']: continue
-						if msec >= task['idle_dur']:
-							self.run_task(task['task_func_name']
-							, caller=CALLER_IDLE)
-							task['idle_done'] = True
-			time.sleep(1.0)
+				if now >= idle_next:
+					idle_next = now + self._idle_check()
+				delay = min(delay, idle_next - now)
+			if delay <= 0: continue
+			if delay <= SPIN:
+				time.sleep(delay)
+			else:
+				self._sched_wake.wait(delay - SPIN)
 
 	def close(self):
 		r'''
 		Destructor.  
 		Remove scheduler jobs, hotkey bindings, stop http server
 		, close event handlers.  
+		Listeners taken by the next instance (see `adopt`)
+		are not touched.  
 		'''
 		start = dtime.now()
 		self._is_alive = False
+		self._sched_wake.set()
 		if self.http_server:
 			self.http_server.shutdown()
-			self.http_server.socket.close()
+			self.http_server.server_close()
 			self.http_server = None
 		if self.global_hk:
 			self.global_hk.unregister()
@@ -1062,37 +1734,41 @@ class Tasks:
 			, win32con.WM_QUIT, 0, 0)
 			winapi.user32.UnhookWindowsHookEx(self.hook_kb.hook_id)
 			self.hook_kb.hook_id = None
-		schedule.clear()
-		for eh, signal in self.event_handlers:
-			try:
-				win32event.SetEvent(signal)
-				eh.close()
-			except Exception as err:
-				dev_print(f'event close error: {err}')
-		app.taskbaricon.Unbind(wx.adv.EVT_TASKBAR_LEFT_DOWN)
-		for hDir, dir_path in tuple(self.dir_change_stop.items()):
-			msg = [dir_path]
+		for key, stop in tuple(self.listeners.items()):
 			try:
-				winapi.CancelIoEx(hDir.handle, None)
-			except OSError as err:
-				if err.winerror == 1168:
-					msg.append(f'{err.strerror} ({err.winerror})')
-				elif err.winerror == 22:
-					pass
-				else:
-					msg.append(f'CancelIoEx OSError: {repr(err)}')
-			except Exception as err:
-				msg.append(f'CancelIoEx general: {repr(err)}')
-			try:
-				hDir.Close()
+				stop()
 			except Exception as err:
-				msg.append(f'hDir.Close exception: {repr(err)}')
-			if is_dev() and len(msg) > 1:
-				dev_print(str_indent(', '.join(msg)))
-				tlog('[app] dir_change exception: ' + ', '.join(msg))
+				dev_print(f'{key[0]} listener close error: {err}')
+		self.listeners.clear()
+		for job in schedule.jobs[:]:
+			if not job.tags: schedule.cancel_job(job)
+		if not HEADLESS: app.taskbaricon.Unbind(wx.adv.EVT_TASKBAR_LEFT_DOWN)
 		if is_dev():
 			dev_print('done in ' + time_diff_human(start, with_ms=True))
 
+	@staticmethod
+	def _dir_handle_close(hDir, dir_path:str):
+		' Interrupts *ReadDirectoryChangesW* and closes the handle '
+		msg = [dir_path]
+		try:
+			winapi.CancelIoEx(hDir.handle, None)
+		except OSError as err:
+			if err.winerror == 1168:
+				msg.append(f'{err.strerror} ({err.winerror})')
+			elif err.winerror == 22:
+				pass
+			else:
+				msg.append(f'CancelIoEx OSError: {repr(err)}')
+		except Exception as err:
+			msg.append(f'CancelIoEx general: {repr(err)}')
+		try:
+			hDir.Close()
+		except Exception as err:
+			msg.append(f'hDir.Close exception: {repr(err)}')
+		if is_dev() and len(msg) > 1:
+			dev_print(str_indent(', '.join(msg)))
+			tlog('[app] dir_change exception: ' + ', '.join(msg))
+
 	def tasks_print(self):
 		r'''
 		Print a table with all tasks.
@@ -1104,6 +1780,11 @@ class Tasks:
 			call_count:int = 0
 			err_count:int = 0
 			last_start:str = ''
+			p50_ms:float = 0.0
+			p95_ms:float = 0.0
+			p99_ms:float = 0.0
+			cache_hits:int = 0
+			cache_misses:int = 0
 			last_err:str = ''
 
 		table = []
@@ -1120,9 +1801,26 @@ class Tasks:
 			task.call_count = task_dic['_call_count']
 			task.err_count = task_dic['err_counter']
 			task.last_err = task_dic['_last_err']
+			task.cache_hits = task_dic['_cache_hits']
+			task.cache_misses = task_dic['_cache_misses']
+			run = Histogram()
+			for hists in tuple(task_dic['_stats'].values()):
+				run.merge(hists['run'])
+			if run.count:
+				task.p50_ms = round(run.percentile(50) * 1000, 1)
+				task.p95_ms = round(run.percentile(95) * 1000, 1)
+				task.p99_ms = round(run.percentile(99) * 1000, 1)
 		table_print(table, use_headers=True)
 tasks:Tasks = None
 
+def task_run(task_func_name:str, caller:str|None=None, **kwargs):
+	r'''
+	Runs the task of the current `tasks`.  
+	Listeners use it instead of the bound `Tasks.run_task`
+	so they can be kept on a crontab reload.  
+	'''
+	tasks.run_task(task_func_name, caller=caller, **kwargs)
+
 def load_crontab(event=None, with_cache:bool=False)->bool:
 	global tasks
 	global crontab
@@ -1132,6 +1830,8 @@ def load_crontab(event=None, with_cache:bool=False)->bool:
 	con_log(f'{lang.load_crontab} {APP_PATH}', tname='app')
 	try:
 		running_before_reload:list = []
+		stats_before_reload:dict = {}
+		prev_tasks:Tasks|None = None
 		if sys.modules.get('crontab') is None:
 			crontab = importlib.import_module('crontab')
 		else:
@@ -1151,11 +1851,12 @@ def load_crontab(event=None, with_cache:bool=False)->bool:
 			else:
 				raise Exception('No more attempts to reload crontab')
 			for cur_task in tasks.task_dict.values():
+				stats_before_reload[cur_task['task_func_name']] = cur_task['_stats']
 				if not cur_task['running']: continue
 				running_before_reload.append(cur_task)
 			dev_print('running tasks: '
 			+ ', '.join(t['task_name'] for t in running_before_reload))
-			tasks.close()
+			prev_tasks = tasks
 			del tmp_crontab
 			del prev_crontab
 			del sys.modules['crontab']
@@ -1166,7 +1867,10 @@ def load_crontab(event=None, with_cache:bool=False)->bool:
 			exec("from plugins.tools import *", globals())
 		tasks = Tasks()
 		app.tasks = tasks
-		tasks.start_listeners()
+		tasks.start_listeners(prev=prev_tasks)
+		for func_name, stats in stats_before_reload.items():
+			if (new_task := tasks.task_dict.get(func_name)):
+				new_task['_stats'] = stats
 		for prev_task in running_before_reload:
 			new_task = tasks.task_dict.get(prev_task['task_func_name'])
 			if not new_task: continue
@@ -1180,10 +1884,12 @@ def load_crontab(event=None, with_cache:bool=False)->bool:
 			new_task['_tid'] = prev_task['_tid']
 			new_task['_caller'] = prev_task['_caller']
 		tasks.enabled = app.enabled
+		app.proc_pool.recycle()
 		thread_start(tasks.run_at_crontab_load, err_msg=True
 		, ident='app: run_at_crontab_load')
-		if is_dev():
-			ttprint('load time: ' + time_diff_human(start, with_ms=True))
+		con_log(lang.load_crontab_done.format(
+			time_diff_human(start, with_ms=True)
+		), tname='app')
 		gc.collect()
 		return True
 	except:
@@ -1192,10 +1898,72 @@ def load_crontab(event=None, with_cache:bool=False)->bool:
 	finally:
 		app._reloaded.set()
 
+def _module_changed(mdl_name:str)->bool:
+	r'''
+	Compares the source file of the module with the state saved
+	in `cache.module_state` and saves the new state.  
+	The content hash is calculated only if the modification
+	time or size has changed, so touching a file is not a change.  
+	A module seen for the first time was just imported,
+	so it is not changed.  
+	'''
+	prev = cache.module_state.get(mdl_name)
+	try:
+		fpath = inspect.getfile(sys.modules[mdl_name])
+		fstat = os.stat(fpath)
+	except (KeyError, TypeError, OSError):
+		cache.module_state.pop(mdl_name, None)
+		return prev is not None
+	if prev and prev[:2] == (fstat.st_mtime_ns, fstat.st_size): return False
+	with open(fpath, 'rb') as fd:
+		digest = hashlib.sha1(fd.read()).hexdigest()
+	cache.module_state[mdl_name] = (fstat.st_mtime_ns, fstat.st_size, digest)
+	return prev is not None and prev[2] != digest
+
+def _modules_scan(own_modules:set, skip:set)->tuple[set, set]:
+	r'''
+	Scans the folders of *own_modules* for the other modules
+	from there that are already imported, and for the new
+	*_patch* files of the imported modules.  
+	Returns (imported modules, modules with a new patch).  
+	'''
+	found, patched = set(), set()
+	scanned = set()
+	for mdl_name in own_modules:
+		try:
+			mdl_dir = os.path.dirname(inspect.getfile(sys.modules[mdl_name]))
+		except (KeyError, TypeError):
+			continue
+		if mdl_dir in scanned: continue
+		scanned.add(mdl_dir)
+		prefix = mdl_name.rpartition('.')[0]
+		try:
+			fnames = os.listdir(mdl_dir)
+		except OSError:
+			continue
+		for fname in fnames:
+			name, ext = os.path.splitext(fname)
+			if ext != '.py' or name in skip: continue
+			full_name = f'{prefix}.{name}' if prefix else name
+			if full_name in sys.modules:
+				found.add(full_name)
+			elif (
+				name.endswith('_patch')
+				and not name[:-len('_patch')] in skip
+				and (base := full_name[:-len('_patch')]) in sys.modules
+			):
+				patched.add(base)
+	return found, patched
+
 def load_modules(with_cache:bool=False):
 	r'''
-	(Re)Loads all application plugins and crontab extensions if any.  
-	*with_cache* - with *static* modules.  
+	Reloads the application plugins and crontab extensions
+	whose source files have changed since the last load,
+	and the modules that import something from them.
+	The folders of the plugins are scanned, so the modules that
+	only other plugins import and the new *_patch* files are
+	noticed too.  
+	*with_cache* - reload all modules, including the *static* ones.  
 	'''
 
 	global crontab
@@ -1217,53 +1985,78 @@ def load_modules(with_cache:bool=False):
 			own_modules.add(obj.__module__)
 		except ValueError:
 			continue
-	if with_cache:
-		rel_mod = own_modules
-	else:
-		rel_mod = own_modules - DO_NOT_RELOAD
-	for mdl_name in rel_mod:
-		if with_cache: dev_print(f'reload module: {mdl_name}')
+	found, changed = _modules_scan(own_modules
+	, DO_NOT_RELOAD | {'__init__', 'crontab'})
+	own_modules |= found
+	for mdl_name in own_modules:
+		if not _module_changed(mdl_name): continue
+		if mdl_name.endswith('_patch'): mdl_name = mdl_name[:-len('_patch')]
+		changed.add(mdl_name)
+	if with_cache: changed = set(own_modules)
+	if not changed:
+		if is_dev():
+			tprint('no changed modules, done in '
+			+ time_diff_human(start, with_ms=True), with_parent=True)
+		return
+	own_ids = {id(sys.modules[m]): m for m in own_modules if m in sys.modules}
+	deps:dict[str, set] = {}
+	for mdl_name in own_modules:
+		refs = deps[mdl_name] = set()
+		if (mdl := sys.modules.get(mdl_name)) is None: continue
+		for obj in tuple(vars(mdl).values()):
+			if issubclass(type(obj), types.ModuleType):
+				ref = own_ids.get(id(obj))
+			else:
+				ref = getattr(obj, '__module__', None)
+			if ref in own_modules and ref != mdl_name: refs.add(ref)
+	rel_mod = []
+	seen = set()
+
+	def add_dependents(mdl_name:str):
+		if mdl_name in seen: return
+		seen.add(mdl_name)
+		if not mdl_name.endswith('_patch') and (
+			with_cache
+			or mdl_name.rpartition('.')[2] not in DO_NOT_RELOAD
+		):
+			rel_mod.append(mdl_name)
+		for dep_name, refs in deps.items():
+			if mdl_name in refs: add_dependents(dep_name)
+
+	for mdl_name in changed: add_dependents(mdl_name)
+	ordered = []
+
+	def add_ordered(mdl_name:str, path:tuple=()):
+		if mdl_name in ordered or mdl_name in path: return
+		for ref in deps.get(mdl_name, ()):
+			if ref in rel_mod: add_ordered(ref, path + (mdl_name,))
+		ordered.append(mdl_name)
+
+	for mdl_name in rel_mod: add_ordered(mdl_name)
+	for mdl_name in ordered:
+		mdl_start = time.perf_counter()
 		prev_mdl = sys.modules.pop(mdl_name)
+		prev_patch = sys.modules.pop(mdl_name + '_patch', None)
 		try:
-			tmp_mdl = importlib.import_module(mdl_name)
-		except PermissionError:
-			con_log(f'permission error: {mdl_name}', tname='app')
-		except ModuleNotFoundError:
-			if traceback.format_exc().rstrip().endswith("_patch'"):
-				con_log(f'patch removed: {mdl_name}', tname='app')
-			else:
-				sys.modules[mdl_name] = prev_mdl
-				msg_err(lang.warn_mod_reload.format(mdl_name)
-				, title=lang.menu_reload, source='load_modules')
-				continue
+			mdl = importlib.import_module(mdl_name)
 		except:
 			sys.modules[mdl_name] = prev_mdl
+			if prev_patch: sys.modules[mdl_name + '_patch'] = prev_patch
 			msg_err(lang.warn_mod_reload.format(mdl_name)
 			, title=lang.menu_reload, source='load_modules')
 			continue
-		del tmp_mdl
 		del prev_mdl
-		del sys.modules[mdl_name]
-		mdl = importlib.import_module(mdl_name)
 		for obj_name, obj in mdl.__dict__.items():
 			if (
 				obj_name.startswith('_')
-				or ( isinstance(object, types.ModuleType) )
+				or issubclass(type(obj), types.ModuleType)
 				or (mdl_name != getattr(obj, '__module__', mdl_name) )
 			):
 				continue
-			if not isinstance(obj, types.FunctionType):
-				if not hasattr(crontab, obj_name):
-					continue
-				setattr(crontab, obj_name, obj)
-				continue
-			for mdl_name_own in own_modules:
-				mdl_own = sys.modules.get(mdl_name_own)
-				if hasattr(mdl_own, obj_name):
-					setattr(mdl_own, obj_name, obj)
 			if hasattr(crontab, obj_name):
 				setattr(crontab, obj_name, obj)
-		sys.modules[mdl_name] = mdl
+		con_log(f'module reloaded: {mdl_name} in '
+		+ f'{(time.perf_counter() - mdl_start) * 1000:.1f} ms', tname='app')
 	if is_dev():
 		tprint('done in ' + time_diff_human(start, with_ms=True)
 		, with_parent=True)
@@ -1306,16 +2099,36 @@ def create_menu_item(menu, task, func=None, parent_menu=None):
 	menu.Append(item)
 
 
-class TaskBarIcon(wx.adv.TaskBarIcon):
+if HEADLESS:
+	class _TaskBarIconBase:
+		r'''
+		Stands in for `wx.adv.TaskBarIcon` in the `-headless` mode:
+		the tray actions work, the icon methods do nothing.  
+		'''
+		def Bind(self, *args, **kwargs): pass
+		def Unbind(self, *args, **kwargs): pass
+		def SetIcon(self, *args, **kwargs): pass
+		def RemoveIcon(self): pass
+		def ShowBalloon(self, title:str='', text:str='', **kwargs):
+			tprint(f'<balloon> {title}: {text}')
+	_AppBase = object
+else:
+	_TaskBarIconBase = wx.adv.TaskBarIcon
+	_AppBase = wx.App
+
+class TaskBarIcon(_TaskBarIconBase):
 	def __init__(self, frame):
 		self.text_dic = {}
+		if HEADLESS:
+			self.icon = self.icon_dis = None
+			return
 		super(TaskBarIcon, self).__init__()
 		self.icon = wx.Icon(APP_ICON)
 		self.icon_dis = wx.Icon(APP_ICON_DIS)
 		self.set_icon()
 		self.Bind(wx.adv.EVT_TASKBAR_LEFT_DOWN, self.on_left_down)
 
-	def CreatePopupMenu(self)->wx.Menu:
+	def CreatePopupMenu(self)->'wx.Menu':
 		menu = wx.Menu()
 		if not sys.modules.get('crontab') is None:
 			if keyboard.is_pressed('shift'):
@@ -1400,7 +2213,7 @@ class TaskBarIcon(wx.adv.TaskBarIcon):
 		*is_end_session* - logoff or shutdown.  
 		'''
 		TASKS_MSG_MAX = 10
-		if is_end_session:
+		if is_end_session or HEADLESS:
 			force = True
 			if is_dev():
 				ttprint(f'end of session')
@@ -1439,26 +2252,33 @@ class TaskBarIcon(wx.adv.TaskBarIcon):
 			dev_print(f'tasks.close exception: {exc}')
 		finally:
 			app.tasks = None
-		app.que_log.stop()
+		for pool in app.task_pools.values(): pool.stop()
+		app.proc_pool.stop()
+		app.que_log.stop(timeout=1)
 		app.que_hook.stop()
 		app.que_wxdialog.stop()
 		app.que_speech.put((None, None))
-		try:
-			app.log_file[1].close()
-		except Exception as exc:
-			ttprint('error closing log file: ' + repr(exc))
+		if app.log_file:
+			try:
+				app.log_file[1].close()
+			except Exception as exc:
+				ttprint('error closing log file: ' + repr(exc))
+		if app.que_trace: app.que_trace.stop(timeout=1)
 		app.que_print.stop(timeout=0.1)
 		self.RemoveIcon()
+		if HEADLESS:
+			app._exit_event.set()
+			return True
 		wx.CallAfter(self.Destroy)
 		app.frame.Close(True)
 		return True
 	
-	def on_query_end_session(self, event:wx.CloseEvent):
+	def on_query_end_session(self, event:'wx.CloseEvent'):
 		dev_print('query end of session')
 		self.on_exit(is_end_session=True)
 		event.Skip(False)
 
-	def on_end_session(self, event:wx.CloseEvent):
+	def on_end_session(self, event:'wx.CloseEvent'):
 		dev_print('end of session')
 		if app.tasks: self.on_exit(is_end_session=True)
 		event.Skip(False)
@@ -1543,10 +2363,10 @@ class TaskBarIcon(wx.adv.TaskBarIcon):
 		tasks.enabled = state
 		app.enabled = state
 		if state:
-			win32api.SetConsoleTitle(APP_NAME)
+			if not HEADLESS: win32api.SetConsoleTitle(APP_NAME)
 			con_log(f'{APP_NAME} enabled', tname='app')
 		else:
-			win32api.SetConsoleTitle(f'{APP_NAME} (disabled)')
+			if not HEADLESS: win32api.SetConsoleTitle(f'{APP_NAME} (disabled)')
 			con_log(f'{APP_NAME} disabled', tname='app')
 		self.set_icon(dis=not state)
 	
@@ -1560,21 +2380,28 @@ class TaskBarIcon(wx.adv.TaskBarIcon):
 		file_open(fpath, parameters=args)
 
 
-class App(wx.App):
+class App(_AppBase):
 
 	def OnInit(self):
 		self.enabled = True
+		self.headless:bool = HEADLESS
 		self.app_threads:dict[int, dict] = {}
-		self.frame=wx.Frame(None, style=wx.DEFAULT_FRAME_STYLE
-			| wx.STAY_ON_TOP)
-		self.taskbaricon = TaskBarIcon(self.frame)
+		if HEADLESS:
+			self.frame = None
+			self.taskbaricon = TaskBarIcon(None)
+		else:
+			self.frame=wx.Frame(None, style=wx.DEFAULT_FRAME_STYLE
+				| wx.STAY_ON_TOP)
+			self.taskbaricon = TaskBarIcon(self.frame)
 		self.show_window = self.taskbaricon.on_left_down
-		self.app_pid = win32process.GetCurrentProcessId()
+		self.app_pid = os.getpid()
 		self.app_hwnd:int = 0
-		self.frame.Bind(wx.EVT_QUERY_END_SESSION
-		, self.taskbaricon.on_query_end_session)
-		self.frame.Bind(wx.EVT_END_SESSION
-		, self.taskbaricon.on_end_session)
+		self._exit_event:threading.Event = threading.Event()
+		if not HEADLESS:
+			self.frame.Bind(wx.EVT_QUERY_END_SESSION
+			, self.taskbaricon.on_query_end_session)
+			self.frame.Bind(wx.EVT_END_SESSION
+			, self.taskbaricon.on_end_session)
 		self.cmd_args:argparse.Namespace = argparse.Namespace()
 		self.is_cmd_task:bool = False
 		self.load_crontab = load_crontab
@@ -1584,11 +2411,16 @@ class App(wx.App):
 		self.que_print:TQueue = None
 		self.que_wxdialog:TQueue = None
 		self.que_speech:queue.Queue = None
+		self.que_trace:TQueue|None = None
 		self.tasks:Tasks = None
+		self.task_pool:TPool = None
+		self.task_pools:dict[str, TPool] = {}
+		self.proc_pool:ProcPool = None
 		self._reloaded:threading.Event = threading.Event()
 		self._reloaded.set()
-		self.log_memory:list[tuple[str, str]] = list()
+		self.log_memory:LogRing = LogRing()
 		self.log_file:tuple[str, object] = tuple()
+		self.log_max_size:int = 0
 		self.icons:tuple[winapi.HICON, winapi.HICON] = tuple()
 		return True
 	
@@ -1611,6 +2443,16 @@ class App(wx.App):
 	def exit(self, force:bool=False):
 		self.taskbaricon.on_exit(force=force)
 
+	def headless_loop(self):
+		r'''
+		The main loop of the `-headless` mode instead of `MainLoop`:
+		waits for `exit` or Ctrl+C.  
+		'''
+		try:
+			while not self._exit_event.wait(1): pass
+		except KeyboardInterrupt:
+			self.exit(force=True)
+
 def show_app_window():
 	try:
 		win_activate(app.app_hwnd)
@@ -1670,16 +2512,20 @@ def _dialog_consumer(task):
 	This runs in the TQueue worker thread, but immediately marshals
 	to main GUI thread
 	'''
+	if HEADLESS:
+		dev_print('no GUI in the headless mode')
+		return
 	wx.CallAfter(task)
 
 def _speech_worker():
 	speak_fun = lambda t: qprint(f'<speak> «{t}»')
-	try:
-		pythoncom.CoInitializeEx(pythoncom.COINIT_APARTMENTTHREADED)
-		speaker = win32com.client.Dispatch('SAPI.SpVoice')
-		speak_fun = speaker.Speak
-	except Exception as exc:
-		dev_print('CoInitializeEx exception:' + str_indent(exc))
+	if sys.platform == 'win32':
+		try:
+			pythoncom.CoInitializeEx(pythoncom.COINIT_APARTMENTTHREADED)
+			speaker = win32com.client.Dispatch('SAPI.SpVoice')
+			speak_fun = speaker.Speak
+		except Exception as exc:
+			dev_print('CoInitializeEx exception:' + str_indent(exc))
 	try:
 		while True:
 			event:threading.Event
@@ -1709,7 +2555,7 @@ def main():
 	global tasks
 	global sett
 	global lang
-	win32api.SetConsoleTitle(APP_NAME)
+	if not HEADLESS: win32api.SetConsoleTitle(APP_NAME)
 	cmd_parser = argparse.ArgumentParser()
 	cmd_parser.add_argument('-dev', action='store_true'
 	, help='Enable debug output')
@@ -1717,6 +2563,8 @@ def main():
 	, help='A task to run and quit')
 	cmd_parser.add_argument('-data', type=str
 	, help='Any data for a task started with *-task* option')
+	cmd_parser.add_argument('-headless', action='store_true'
+	, help='Run without the tray icon and GUI')
 	try:
 		cmd_args = cmd_parser.parse_args()
 	except SystemExit:
@@ -1748,30 +2596,61 @@ def main():
 	print(lang.load_homepage)
 	print(lang.load_donate + '\n\n')
 	try:
-		app = App(False)
+		if HEADLESS:
+			app = App()
+			app.OnInit()
+			main_loop = app.headless_loop
+		else:
+			app = App(False)
+			main_loop = app.MainLoop
 		__builtins__.app = app
-		app.que_print = TQueue(consumer=print, max_size=8192)
-		app.que_log = TQueue(consumer=_tlog, max_size=8192)
-		app.que_hook = TQueue(consumer=hook_consumer, max_size=8192)
+		app.que_print = TQueue(consumer=_print_batch, max_size=8192, batch=256
+		, overflow='drop_oldest')
+		if sett.log_max_size: app.log_max_size = size_int(sett.log_max_size)
+		app.que_log = TQueue(consumer=_tlog, max_size=8192, batch=1024
+		, batch_wait=value_to_unit(sett.log_flush, 'sec'))
+		app.que_hook = TQueue(consumer=hook_consumer, max_size=8192
+		, overflow='drop_newest')
 		app.que_wxdialog = TQueue(consumer=_dialog_consumer)
 		app.que_speech = Queue(maxsize=16)
+		if sett.trace:
+			app.que_trace = TQueue(consumer=trace_writer(sett.trace_file
+			, size_int(sett.trace_max_size)), max_size=8192)
+		lane_size, lane_extra = divmod(sett.task_pool_size
+		, len(tcon.TASK_PRIORITY))
+		limits = TPoolLimits()
+		app.task_pools = {
+			lane: TPool(max_workers=lane_size + (
+				lane_extra if lane == tcon.PRIORITY_NORMAL else 0
+			), ident=f'app: task pool ({lane})', priority=priority
+			, limits=limits)
+			for lane, priority in tcon.TASK_PRIORITY.items()
+		}
+		app.task_pool = app.task_pools[tcon.PRIORITY_NORMAL]
+		app.proc_pool = ProcPool(size=sett.proc_pool_size
+		, max_jobs=sett.proc_pool_max_jobs
+		, max_mem=size_int(sett.proc_pool_max_mem)
+		, ident='app: process pool')
 		thread_start(_speech_worker, ident='app: _speech_worker')
 		app.is_cmd_task = not cmd_args.task is None
 		app.cmd_args = cmd_args
-		app.icons = icon_file_load('resources\\icon.ico')
-		app._win_save()
+		if not HEADLESS:
+			app.icons = icon_file_load('resources\\icon.ico')
+			app._win_save()
 		if load_crontab():
+			if cmd_args.dev: app_imports_print()
 			if cmd_args.task:
 				event = threading.Event()
 				thread_start(wait_exit, args=(event,), ident='app: wait_exit')
 				task_start(cmd_args.task, caller=CALLER_CMDLINE
 				, data=cmd_args.data, wait_event=event)
-				app.MainLoop()
+				main_loop()
 				return
 			tasks.run_at_startup()
 			tasks.run_at_sys_startup()
-		thread_start(con_key_listener, ident='app: console key listener')
-		app.MainLoop()
+		if sys.platform == 'win32':
+			thread_start(con_key_listener, ident='app: console key listener')
+		main_loop()
 	except Exception as exc:
 		msg_err(f'General exception: {repr(exc)}')
 		input('Press Enter to exit...')